@@ -2,13 +2,77 @@
 Bot Notifier module for sending Telegram notifications via Bot API.
 """
 
+import asyncio
 import httpx
 import logging
-from typing import Optional
+import orjson
+import random
+import time
+from collections import OrderedDict
+from enum import IntEnum
+from typing import Iterable, List, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
 
+class NotifyKind(IntEnum):
+    """Kinds of notifications sent to task owners"""
+    SUCCESS = 0
+    FAILURE = 1
+    CLEANUP = 2
+
+
+# Notification text templates (HTML parse mode)
+_SUCCESS_TMPL = (
+    "✅ <b>保活成功</b>\n\n"
+    "任务 ID: <code>{uuid}</code>\n"
+    "状态: 心跳执行成功"
+)
+_FAILURE_TMPL = (
+    "⚠️ <b>保活失败</b>\n\n"
+    "任务 ID: <code>{uuid}</code>\n"
+    "错误原因: {error}"
+)
+_CLEANUP_TMPL = (
+    "🗑️ <b>任务已清理</b>\n\n"
+    "任务 ID: <code>{uuid}</code>\n"
+    "清理原因: {reason}\n\n"
+    "该任务已被移除，不再执行保活操作。"
+)
+_TEMPLATES = {
+    NotifyKind.SUCCESS: _SUCCESS_TMPL,
+    NotifyKind.FAILURE: _FAILURE_TMPL,
+    NotifyKind.CLEANUP: _CLEANUP_TMPL,
+}
+
+# Constant parts of every sendMessage JSON body; chat_id and text are spliced in
+_PAYLOAD_PREFIX = b'{"parse_mode":"HTML","chat_id":'
+_PAYLOAD_TEXT = b',"text":'
+_JSON_HEADERS = {"Content-Type": "application/json"}
+
+# How long a chat that rejected the bot is skipped, and how many are remembered
+BLOCKED_CHAT_TTL = 3600  # 1 hour
+BLOCKED_CHAT_CACHE_SIZE = 4096
+
+# Retry policy for 429 (rate limited) and 5xx responses
+SEND_MAX_ATTEMPTS = 3
+SEND_MAX_RETRY_DELAY = 30  # seconds
+
+
+def _encode_payload(chat_id: int, text: str) -> bytes:
+    """
+    Build the sendMessage JSON body without an intermediate dict.
+    
+    Args:
+        chat_id: Telegram chat ID to send message to
+        text: Message text (JSON-escaped by orjson)
+        
+    Returns:
+        UTF-8 encoded JSON body
+    """
+    return b"".join((_PAYLOAD_PREFIX, b"%d" % chat_id, _PAYLOAD_TEXT, orjson.dumps(text), b"}"))
+
+
 class BotNotifier:
     """
     Handles sending notifications through Telegram Bot API.
@@ -19,16 +83,91 @@ class BotNotifier:
     - Task cleanup/removal
     """
     
-    def __init__(self, bot_token: str):
+    def __init__(self, bot_token: str, max_concurrent: int = 20):
         """
         Initialize the Bot Notifier.
         
         Args:
             bot_token: Telegram Bot API token
+            max_concurrent: Maximum number of in-flight sendMessage requests (default: 20)
         """
         self.bot_token = bot_token
         self.base_url = f"https://api.telegram.org/bot{bot_token}"
-        self.client = httpx.AsyncClient(timeout=30.0)
+        self._send_url = f"{self.base_url}/sendMessage"
+        # All traffic goes to api.telegram.org, so keep one pooled HTTP/2
+        # connection alive and multiplex every sendMessage over it
+        self.client = httpx.AsyncClient(
+            http2=True,
+            # Every request body is pre-serialized JSON, so the content type
+            # is set once here instead of being merged in per request
+            headers=_JSON_HEADERS,
+            limits=httpx.Limits(
+                max_keepalive_connections=32,
+                max_connections=64,
+                keepalive_expiry=300
+            ),
+            timeout=httpx.Timeout(connect=5.0, read=30.0, write=10.0, pool=5.0)
+        )
+        
+        # Cap concurrent requests so fan-outs stay under Bot API rate limits
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        
+        # chat_id -> monotonic deadline until which sends are skipped
+        self._blocked: "OrderedDict[int, float]" = OrderedDict()
+    
+    async def warm_up(self) -> bool:
+        """
+        Open the connection to Telegram Bot API ahead of the first notification.
+        
+        Issues a getMe call so the TCP/TLS session is established and kept
+        in the pool before any heartbeat needs to notify.
+        
+        Returns:
+            True if the bot token was accepted, False otherwise
+        """
+        if not self.bot_token:
+            return False
+        
+        try:
+            response = await self.client.get(f"{self.base_url}/getMe")
+            if response.status_code == 200:
+                logger.info("Bot API connection warmed up")
+                return True
+            logger.warning("Bot API warm-up failed: HTTP %s", response.status_code)
+            return False
+        except httpx.RequestError as e:
+            logger.warning("Network error during Bot API warm-up: %s", e)
+            return False
+    
+    def _is_blocked(self, chat_id: int) -> bool:
+        """
+        Check whether a chat recently reported "chat not found" or "bot was blocked".
+        
+        Args:
+            chat_id: Telegram chat ID
+            
+        Returns:
+            True if sending to this chat should be skipped
+        """
+        deadline = self._blocked.get(chat_id)
+        if deadline is None:
+            return False
+        if deadline > time.monotonic():
+            return True
+        del self._blocked[chat_id]
+        return False
+    
+    def _mark_blocked(self, chat_id: int):
+        """
+        Remember that a chat cannot receive messages for BLOCKED_CHAT_TTL seconds.
+        
+        Args:
+            chat_id: Telegram chat ID
+        """
+        self._blocked[chat_id] = time.monotonic() + BLOCKED_CHAT_TTL
+        self._blocked.move_to_end(chat_id)
+        if len(self._blocked) > BLOCKED_CHAT_CACHE_SIZE:
+            self._blocked.popitem(last=False)
     
     async def _send_message(self, chat_id: int, text: str) -> bool:
         """
@@ -41,101 +180,224 @@ class BotNotifier:
         Returns:
             True if message sent successfully, False otherwise
         """
-        url = f"{self.base_url}/sendMessage"
-        payload = {
-            "chat_id": chat_id,
-            "text": text,
-            "parse_mode": "HTML"
-        }
+        if self._is_blocked(chat_id):
+            logger.debug("Skipping notification to unreachable chat_id=%s", chat_id)
+            return False
         
-        try:
-            response = await self.client.post(url, json=payload)
-            
-            if response.status_code == 200:
-                logger.info(f"Notification sent successfully to chat_id={chat_id}")
-                return True
-            elif response.status_code == 401:
-                # Unauthorized - invalid bot token
-                logger.error(f"Bot token is invalid (401 Unauthorized)")
-                return False
-            elif response.status_code == 400:
-                # Bad Request - likely user hasn't started the bot
-                response_data = response.json()
-                error_description = response_data.get("description", "Unknown error")
+        body = _encode_payload(chat_id, text)
+        
+        for attempt in range(1, SEND_MAX_ATTEMPTS + 1):
+            try:
+                async with self._semaphore:
+                    response = await self.client.post(self._send_url, content=body)
                 
-                if "chat not found" in error_description.lower() or "bot was blocked" in error_description.lower():
-                    logger.warning(f"User {chat_id} has not started the bot or blocked it: {error_description}")
+                if response.status_code == 200:
+                    logger.info("Notification sent successfully to chat_id=%s", chat_id)
+                    return True
+                elif response.status_code == 401:
+                    # Unauthorized - invalid bot token
+                    logger.error("Bot token is invalid (401 Unauthorized)")
+                    return False
+                elif response.status_code == 400:
+                    # Bad Request - likely user hasn't started the bot
+                    response_text = response.text.lower()
+                    
+                    if "chat not found" in response_text or "bot was blocked" in response_text:
+                        self._mark_blocked(chat_id)
+                        logger.warning("User %s has not started the bot or blocked it", chat_id)
+                    else:
+                        logger.error(
+                            "Bad request when sending message to %s: %s",
+                            chat_id, self._error_description(response)
+                        )
+                    return False
+                elif response.status_code == 429 or response.status_code >= 500:
+                    # Rate limited or server-side error - retry with backoff
+                    delay = self._retry_delay(response, attempt)
+                    if attempt == SEND_MAX_ATTEMPTS or delay > SEND_MAX_RETRY_DELAY:
+                        logger.error(
+                            "Failed to send notification: HTTP %s after %s attempt(s)",
+                            response.status_code, attempt
+                        )
+                        return False
+                    
+                    logger.warning(
+                        "Notification to chat_id=%s got HTTP %s, retrying in %.1fs (%s/%s)",
+                        chat_id, response.status_code, delay, attempt, SEND_MAX_ATTEMPTS
+                    )
+                    await asyncio.sleep(delay)
                 else:
-                    logger.error(f"Bad request when sending message to {chat_id}: {error_description}")
+                    logger.error("Failed to send notification: HTTP %s", response.status_code)
+                    return False
+                    
+            except httpx.RequestError as e:
+                logger.error("Network error when sending notification: %s", e)
                 return False
-            else:
-                logger.error(f"Failed to send notification: HTTP {response.status_code}")
+            except Exception as e:
+                logger.error("Unexpected error when sending notification: %s", e)
                 return False
-                
-        except httpx.RequestError as e:
-            logger.error(f"Network error when sending notification: {e}")
-            return False
-        except Exception as e:
-            logger.error(f"Unexpected error when sending notification: {e}")
-            return False
+        
+        return False
     
-    async def send_success(self, chat_id: int, uuid: str) -> bool:
+    @staticmethod
+    def _error_description(response: httpx.Response) -> str:
         """
-        Send a heartbeat success notification.
+        Extract the error description from a Bot API error response.
         
         Args:
-            chat_id: Telegram chat ID to notify
-            uuid: Task UUID
+            response: Non-200 response from Telegram
             
         Returns:
-            True if notification sent successfully, False otherwise
+            The "description" field, or the raw body if it isn't valid JSON
         """
-        text = (
-            f"✅ <b>保活成功</b>\n\n"
-            f"任务 ID: <code>{uuid}</code>\n"
-            f"状态: 心跳执行成功"
-        )
-        return await self._send_message(chat_id, text)
+        try:
+            return orjson.loads(response.content).get("description", "Unknown error")
+        except (orjson.JSONDecodeError, AttributeError):
+            return response.text
     
-    async def send_failure(self, chat_id: int, uuid: str, error: str) -> bool:
+    @staticmethod
+    def _retry_delay(response: httpx.Response, attempt: int) -> float:
         """
-        Send a heartbeat failure notification.
+        Compute how long to wait before retrying a rejected request.
         
         Args:
-            chat_id: Telegram chat ID to notify
-            uuid: Task UUID
-            error: Error message describing the failure
+            response: The 429/5xx response from Telegram
+            attempt: Number of the attempt that just failed (1-based)
             
         Returns:
-            True if notification sent successfully, False otherwise
+            Delay in seconds; Telegram's Retry-After header wins when present
+        """
+        retry_after = response.headers.get("Retry-After")
+        if retry_after is not None:
+            try:
+                return float(retry_after)
+            except ValueError:
+                pass
+        return min(2 ** (attempt - 1), SEND_MAX_RETRY_DELAY) + random.random()
+    
+    async def send_many(self, kind: NotifyKind, targets: Iterable[Tuple[int, str]], **fields: str) -> List[bool]:
         """
-        text = (
-            f"⚠️ <b>保活失败</b>\n\n"
-            f"任务 ID: <code>{uuid}</code>\n"
-            f"错误原因: {error}"
+        Send the same kind of task notification to several tasks concurrently.
+        
+        All requests are dispatched at once so their network round trips
+        overlap instead of being awaited one after another.
+        
+        Args:
+            kind: Which notification template to use
+            targets: Iterable of (chat_id, uuid) pairs
+            **fields: Extra template fields shared by every notification
+            
+        Returns:
+            List of send results in the same order as the input
+        """
+        results = await asyncio.gather(
+            *(self.notify(kind, chat_id, uuid, **fields) for chat_id, uuid in targets),
+            return_exceptions=True
         )
-        return await self._send_message(chat_id, text)
+        return [result is True for result in results]
     
-    async def send_cleanup(self, chat_id: int, uuid: str, reason: str) -> bool:
+    async def notify(self, kind: NotifyKind, chat_id: int, uuid: str, **fields: str) -> bool:
         """
-        Send a task cleanup notification.
+        Send a task notification of the given kind.
         
         Args:
+            kind: Which notification template to use
             chat_id: Telegram chat ID to notify
             uuid: Task UUID
-            reason: Reason for task cleanup
+            **fields: Extra template fields (error for FAILURE, reason for CLEANUP)
             
         Returns:
             True if notification sent successfully, False otherwise
         """
-        text = (
-            f"🗑️ <b>任务已清理</b>\n\n"
-            f"任务 ID: <code>{uuid}</code>\n"
-            f"清理原因: {reason}\n\n"
-            f"该任务已被移除，不再执行保活操作。"
-        )
+        if self._is_blocked(chat_id):
+            return False
+        text = _TEMPLATES[kind].format(uuid=uuid, **fields)
         return await self._send_message(chat_id, text)
     
+    async def send_success(self, chat_id: int, uuid: str) -> bool:
+        """Send a heartbeat success notification."""
+        return await self.notify(NotifyKind.SUCCESS, chat_id, uuid)
+    
+    async def send_failure(self, chat_id: int, uuid: str, error: str) -> bool:
+        """Send a heartbeat failure notification."""
+        return await self.notify(NotifyKind.FAILURE, chat_id, uuid, error=error)
+    
+    async def send_cleanup(self, chat_id: int, uuid: str, reason: str) -> bool:
+        """Send a task cleanup notification."""
+        return await self.notify(NotifyKind.CLEANUP, chat_id, uuid, reason=reason)
+    
     async def close(self):
         """Close the HTTP client."""
+        global _notifier, _notifier_loop
+        # Only the current shared instance may clear the globals, so closing a
+        # stale notifier never unregisters the live one
+        if _notifier is self:
+            _notifier = None
+            _notifier_loop = None
         await self.client.aclose()
+
+
+# Process-wide notifier shared by all keepalive tasks, and the loop it belongs to
+_notifier: Optional[BotNotifier] = None
+_notifier_loop: Optional[asyncio.AbstractEventLoop] = None
+# Pending closes of notifiers replaced after a loop change (kept referenced until done)
+_stale_closes: set = set()
+
+
+async def _close_stale_notifier(notifier: BotNotifier):
+    """Close a replaced notifier's HTTP client, logging instead of raising on failure."""
+    try:
+        await notifier.client.aclose()
+    except Exception as e:
+        logger.warning("Dropped HTTP client of stale BotNotifier: %s", e)
+
+
+def _discard_notifier(notifier: BotNotifier, old_loop: Optional[asyncio.AbstractEventLoop]):
+    """
+    Close a notifier that belongs to another event loop.
+    
+    Its pooled connections are bound to that loop, so the close runs there while
+    the loop is still alive; otherwise it is attempted on the running loop and
+    any failure is logged.
+    
+    Args:
+        notifier: The notifier being replaced
+        old_loop: The loop the notifier was created on
+    """
+    if old_loop is not None and old_loop.is_running() and not old_loop.is_closed():
+        asyncio.run_coroutine_threadsafe(_close_stale_notifier(notifier), old_loop)
+        return
+    
+    task = asyncio.get_running_loop().create_task(_close_stale_notifier(notifier))
+    _stale_closes.add(task)
+    task.add_done_callback(_stale_closes.discard)
+
+
+def get_notifier(bot_token: str, max_concurrent: int = 20) -> BotNotifier:
+    """
+    Get the process-wide BotNotifier, creating it on first use.
+    
+    Every caller on the same event loop shares the same instance and
+    therefore the same httpx.AsyncClient connection pool to api.telegram.org.
+    The pooled connections and the semaphore belong to the loop they were
+    first used on, so a call from a different loop gets a new notifier and
+    the old one is closed.
+    
+    Args:
+        bot_token: Telegram Bot API token
+        max_concurrent: Maximum number of in-flight sendMessage requests (default: 20)
+        
+    Returns:
+        The shared BotNotifier instance for the running loop
+        
+    Raises:
+        RuntimeError: If called outside a running event loop
+    """
+    global _notifier, _notifier_loop
+    loop = asyncio.get_running_loop()
+    if _notifier is None or _notifier_loop is not loop:
+        if _notifier is not None:
+            _discard_notifier(_notifier, _notifier_loop)
+        _notifier = BotNotifier(bot_token, max_concurrent)
+        _notifier_loop = loop
+    return _notifier
@@ -3,7 +3,7 @@ Configuration management for the Telegram session keepalive web interface.
 Loads configuration from environment variables with validation and defaults.
 """
 
-from pydantic_settings import BaseSettings
+from pydantic_settings import BaseSettings, SettingsConfigDict
 from typing import Optional
 
 
@@ -21,6 +21,7 @@ class Config(BaseSettings):
     - TG_INTERVAL_SECONDS: Heartbeat interval (default: 86400 = 1 day)
     - TG_JITTER_SECONDS: Random jitter for interval (default: 300 = 5 minutes)
     - TG_HEART_BEAT_MAX_FAIL: Max consecutive failures before cleanup (default: 3)
+    - TG_NOTIFY_CONCURRENCY: Max concurrent Bot API requests (default: 20)
     - DATA_DIR: Directory for storing session files (default: ./data)
     """
     
@@ -34,14 +35,16 @@ class Config(BaseSettings):
     TG_INTERVAL_SECONDS: int = 86400  # 1 day
     TG_JITTER_SECONDS: int = 300      # 5 minutes
     TG_HEART_BEAT_MAX_FAIL: int = 3
+    TG_NOTIFY_CONCURRENCY: int = 20
     DATA_DIR: str = "./data"
     
-    class Config:
-        """Pydantic settings configuration"""
-        env_file = ".env"
-        env_file_encoding = "utf-8"
-        case_sensitive = True
-        extra = "ignore"  # Ignore extra environment variables
+    # Pydantic settings configuration
+    model_config = SettingsConfigDict(
+        env_file=".env",
+        env_file_encoding="utf-8",
+        case_sensitive=True,
+        extra="ignore"  # Ignore extra environment variables
+    )
 
 
 def load_config() -> Config:
@@ -2,10 +2,17 @@
 Pydantic data models for the Telegram session keepalive web management interface.
 """
 
-from pydantic import BaseModel, Field, field_validator
+from pydantic import BaseModel, ConfigDict, Field, StringConstraints, field_validator
 from datetime import datetime
-from typing import Optional
-import re
+from typing import Annotated, Optional
+from uuid import UUID
+
+
+# Separators allowed inside phone numbers
+_PHONE_STRIP = str.maketrans('', '', ' -')
+
+# Non-blank Telethon StringSession, checked inside pydantic-core; the value is never rewritten
+SessionString = Annotated[str, StringConstraints(min_length=1, pattern=r"\S")]
 
 
 class SessionData(BaseModel):
@@ -15,7 +22,7 @@ class SessionData(BaseModel):
     """
     uuid: str = Field(..., description="Unique identifier for the task")
     tg_id: int = Field(..., description="Telegram user ID")
-    session_string: str = Field(..., description="Telethon StringSession")
+    session_string: SessionString = Field(..., description="Telethon StringSession")
     notify_chat_id: int = Field(..., description="Chat ID to receive notifications")
     consecutive_failures: int = Field(default=0, ge=0, description="Number of consecutive heartbeat failures")
     created_at: datetime = Field(..., description="Task creation timestamp")
@@ -24,22 +31,19 @@ class SessionData(BaseModel):
     @field_validator('uuid')
     @classmethod
     def validate_uuid(cls, v: str) -> str:
-        """Validate UUID format (basic check for 8-4-4-4-12 pattern)"""
-        uuid_pattern = r'^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$'
-        if not re.match(uuid_pattern, v, re.IGNORECASE):
+        """Validate UUID format (canonical 8-4-4-4-12 pattern)"""
+        try:
+            # UUID() also accepts braces/urn/hex-only forms, so require the
+            # input to already be in canonical form
+            valid = str(UUID(v)) == v.lower()
+        except ValueError:
+            valid = False
+        if not valid:
             raise ValueError('Invalid UUID format')
         return v
 
-    @field_validator('session_string')
-    @classmethod
-    def validate_session_string(cls, v: str) -> str:
-        """Validate that session_string is not empty"""
-        if not v or not v.strip():
-            raise ValueError('session_string cannot be empty')
-        return v
-
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "uuid": "550e8400-e29b-41d4-a716-446655440000",
                 "tg_id": 123456789,
@@ -50,6 +54,7 @@ class SessionData(BaseModel):
                 "last_heartbeat": "2025-01-14T12:00:00Z"
             }
         }
+    )
 
 
 class LoginStartRequest(BaseModel):
@@ -61,7 +66,7 @@ class LoginStartRequest(BaseModel):
     def validate_phone(cls, v: str) -> str:
         """Validate phone number format (basic check for digits and optional +)"""
         # Remove spaces and dashes for validation
-        cleaned = v.replace(' ', '').replace('-', '')
+        cleaned = v.translate(_PHONE_STRIP)
         
         # Check if it starts with + and has digits
         if cleaned.startswith('+'):
@@ -75,12 +80,13 @@ class LoginStartRequest(BaseModel):
         
         return v
 
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "phone": "+1234567890"
             }
         }
+    )
 
 
 class LoginCodeRequest(BaseModel):
@@ -100,13 +106,14 @@ class LoginCodeRequest(BaseModel):
         
         return v
 
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "session_id": "abc123def456...",
                 "code": "12345"
             }
         }
+    )
 
 
 class LoginPasswordRequest(BaseModel):
@@ -122,52 +129,64 @@ class LoginPasswordRequest(BaseModel):
             raise ValueError('Password cannot be empty')
         return v
 
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "session_id": "abc123def456...",
                 "password": "my2fapassword"
             }
         }
+    )
 
 
 class CreateTaskRequest(BaseModel):
     """Request model for creating a keepalive task"""
-    session_string: str = Field(..., description="Telethon StringSession")
+    session_string: SessionString = Field(..., description="Telethon StringSession")
     notify_chat_id: int = Field(..., description="Chat ID to receive notifications")
 
-    @field_validator('session_string')
-    @classmethod
-    def validate_session_string(cls, v: str) -> str:
-        """Validate that session_string is not empty"""
-        if not v or not v.strip():
-            raise ValueError('session_string cannot be empty')
-        return v
-
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "session_string": "1AQAAA...",
                 "notify_chat_id": 123456789
             }
         }
+    )
 
 
 class ValidateSessionRequest(BaseModel):
     """Request model for validating a StringSession"""
-    session_string: str = Field(..., description="Telethon StringSession to validate")
+    session_string: SessionString = Field(..., description="Telethon StringSession to validate")
 
-    @field_validator('session_string')
-    @classmethod
-    def validate_session_string(cls, v: str) -> str:
-        """Validate that session_string is not empty"""
-        if not v or not v.strip():
-            raise ValueError('session_string cannot be empty')
-        return v
-
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "session_string": "1AQAAA..."
             }
         }
+    )
+
+
+class TaskInfoResponse(BaseModel):
+    """Response model for task information"""
+    uuid: str = Field(..., description="Unique identifier for the task")
+    session_string: str = Field(..., description="Telethon StringSession")
+    tg_id: Optional[int] = Field(default=None, description="Telegram user ID")
+    notify_chat_id: Optional[int] = Field(default=None, description="Chat ID to receive notifications")
+    created_at: Optional[datetime] = Field(default=None, description="Task creation timestamp")
+    last_heartbeat: Optional[datetime] = Field(default=None, description="Last successful heartbeat timestamp")
+    consecutive_failures: int = Field(default=0, description="Number of consecutive heartbeat failures")
+
+    model_config = ConfigDict(
+        json_schema_extra={
+            "example": {
+                "uuid": "550e8400-e29b-41d4-a716-446655440000",
+                "session_string": "1AQAAA...",
+                "tg_id": 123456789,
+                "notify_chat_id": 123456789,
+                "created_at": "2025-01-14T10:30:00Z",
+                "last_heartbeat": "2025-01-14T12:00:00Z",
+                "consecutive_failures": 0
+            }
+        }
+    )
@@ -4,25 +4,32 @@ Handles task creation, scheduling, execution, and cleanup.
 """
 
 import asyncio
-import json
 import logging
 import os
-import random
 import uuid as uuid_module
-from datetime import datetime, timedelta
+from contextlib import suppress
+from dataclasses import dataclass, field
+from datetime import datetime
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Dict, List, Optional, Set
 
+import orjson
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from pydantic import ValidationError
 
 from models import SessionData
 from telegram_client import TelegramClientWrapper
-from bot_notifier import BotNotifier
+from bot_notifier import BotNotifier, NotifyKind
 
 
 logger = logging.getLogger(__name__)
 
+# Heartbeat state changes written within this window collapse into one save
+SAVE_DEBOUNCE_SECONDS = 2.0
+
+# SessionData fields that change after creation; everything else is encoded once
+_MUTABLE_FIELDS = {'consecutive_failures', 'last_heartbeat'}
+
 
 def mask_sensitive_data(data: str, visible_chars: int = 10) -> str:
     """
@@ -42,28 +49,24 @@ def mask_sensitive_data(data: str, visible_chars: int = 10) -> str:
     return data[:visible_chars] + "..."
 
 
+@dataclass(frozen=True, slots=True)
 class Config:
     """Configuration class for session manager settings."""
     
-    def __init__(
-        self,
-        api_id: int,
-        api_hash: str,
-        interval_seconds: int = 86400,
-        jitter_seconds: int = 300,
-        notify_bot_token: str = "",
-        notify_bot_name: str = "",
-        max_failures: int = 3,
-        data_dir: str = "./data"
-    ):
-        self.api_id = api_id
-        self.api_hash = api_hash
-        self.interval_seconds = interval_seconds
-        self.jitter_seconds = jitter_seconds
-        self.notify_bot_token = notify_bot_token
-        self.notify_bot_name = notify_bot_name
-        self.max_failures = max_failures
-        self.data_dir = data_dir
+    api_id: int
+    api_hash: str = field(repr=False)
+    interval_seconds: int = 86400
+    jitter_seconds: int = 300
+    notify_bot_token: str = field(default="", repr=False)
+    notify_bot_name: str = ""
+    max_failures: int = 3
+    data_dir: str = "./data"
+    notify_concurrency: int = 20
+    # Resolved once so per-request path checks don't hit the filesystem
+    data_path: Path = field(init=False, repr=False)
+    
+    def __post_init__(self):
+        object.__setattr__(self, 'data_path', Path(self.data_dir).resolve())
 
 
 class SessionManager:
@@ -108,10 +111,17 @@ class SessionManager:
         # TG_ID to UUID mapping for uniqueness constraint
         self.tg_id_to_uuid: Dict[int, str] = {}
         
-        # File locks for concurrent file access protection
+        # Pre-encoded JSON of the immutable fields per task, minus the closing brace
+        self._static_json: Dict[str, bytes] = {}
+        
+        # File locks for concurrent file access protection (evicted on cleanup)
         self._file_locks: Dict[str, asyncio.Lock] = {}
         
-        logger.info(f"SessionManager initialized with data_dir={self.data_dir}")
+        # Debounced saves: uuid -> pending timer, plus flushes currently running
+        self._pending_saves: Dict[str, asyncio.TimerHandle] = {}
+        self._flush_tasks: Set[asyncio.Task] = set()
+        
+        logger.info("SessionManager initialized with data_dir=%s", self.data_dir)
     
     async def initialize(self):
         """
@@ -126,54 +136,51 @@ class SessionManager:
         
         # Scan data directory for JSON files
         if not self.data_dir.exists():
-            logger.warning(f"Data directory does not exist: {self.data_dir}")
+            logger.warning("Data directory does not exist: %s", self.data_dir)
             return
         
-        # Phase 1: Load all session files into a temporary dict
-        all_sessions = {}  # uuid -> SessionData
-        for json_file in self.data_dir.glob("*.json"):
-            try:
-                session_data = self._load_session_file(json_file.stem)
-                if session_data:
-                    all_sessions[session_data.uuid] = session_data
-            except Exception as e:
+        # Collect session file stems (scandir avoids a Path object + stat per entry)
+        with os.scandir(self.data_dir) as it:
+            stems = [
+                entry.name[:-5] for entry in it
+                if entry.name.endswith('.json') and entry.is_file(follow_symlinks=False)
+            ]
+        
+        # Load all session files concurrently in the thread pool
+        results = await asyncio.gather(
+            *(asyncio.to_thread(self._load_session_file, stem) for stem in stems),
+            return_exceptions=True
+        )
+        
+        # Single pass: keep only the newest session per TG_ID, collect the rest
+        best: Dict[int, SessionData] = {}  # tg_id -> newest SessionData
+        losers: List[SessionData] = []
+        for stem, session_data in zip(stems, results):
+            if isinstance(session_data, Exception):
                 error_count += 1
-                logger.error(f"Failed to load session file {json_file}: {e}")
-        
-        # Phase 2: Group by TG_ID and find the newest for each
-        tg_id_groups = {}  # tg_id -> list of (uuid, created_at)
-        for uuid, session_data in all_sessions.items():
-            tg_id = session_data.tg_id
-            if tg_id not in tg_id_groups:
-                tg_id_groups[tg_id] = []
-            tg_id_groups[tg_id].append((uuid, session_data.created_at))
-        
-        # Phase 3: For each TG_ID, keep only the newest task
-        tasks_to_keep = set()
-        tasks_to_delete = set()
-        
-        for tg_id, uuid_list in tg_id_groups.items():
-            if len(uuid_list) == 1:
-                # No duplicates, keep this task
-                tasks_to_keep.add(uuid_list[0][0])
-            else:
-                # Multiple tasks with same TG_ID, find the newest
-                newest_uuid = max(uuid_list, key=lambda x: x[1])[0]
-                tasks_to_keep.add(newest_uuid)
-                
-                # Mark others for deletion
-                for uuid, _ in uuid_list:
-                    if uuid != newest_uuid:
-                        tasks_to_delete.add(uuid)
-                        logger.warning(
-                            f"Found duplicate tg_id {tg_id}: "
-                            f"will delete old UUID {uuid}, keeping newer UUID {newest_uuid}"
-                        )
-        
-        # Phase 4: Load tasks to keep and delete old ones
-        for uuid in tasks_to_keep:
-            session_data = all_sessions[uuid]
+                logger.error("Failed to load session file %s.json: %s", stem, session_data)
+                continue
             
+            if not session_data:
+                continue
+            
+            current = best.get(session_data.tg_id)
+            if current is None:
+                best[session_data.tg_id] = session_data
+                continue
+            
+            # Duplicate TG_ID: the older task loses
+            if session_data.created_at > current.created_at:
+                best[session_data.tg_id] = session_data
+                current, session_data = session_data, current
+            losers.append(session_data)
+            logger.warning(
+                "Found duplicate tg_id %s: will delete old UUID %s, keeping newer UUID %s",
+                session_data.tg_id, session_data.uuid, current.uuid
+            )
+        
+        # Load tasks to keep
+        for session_data in best.values():
             # Store in cache
             self.sessions[session_data.uuid] = session_data
             self.tg_id_to_uuid[session_data.tg_id] = session_data.uuid
@@ -182,31 +189,27 @@ class SessionManager:
             await self.start_heartbeat(session_data.uuid)
             
             loaded_count += 1
-            logger.info(f"Loaded session: {session_data.uuid}")
+            logger.info("Loaded session: %s", session_data.uuid)
+        
+        # Send cleanup notifications for replaced tasks concurrently
+        await self.bot_notifier.send_many(
+            NotifyKind.CLEANUP,
+            ((session_data.notify_chat_id, session_data.uuid) for session_data in losers),
+            reason="被新任务替换"
+        )
         
         # Delete old duplicate files
-        for uuid in tasks_to_delete:
-            session_data = all_sessions[uuid]
-            
-            # Send cleanup notification
-            await self.bot_notifier.send_cleanup(
-                session_data.notify_chat_id,
-                uuid,
-                "被新任务替换"
-            )
-            
-            # Delete file
-            file_path = self.data_dir / f"{uuid}.json"
+        for session_data in losers:
+            file_path = self.data_dir / f"{session_data.uuid}.json"
             try:
-                if file_path.exists():
-                    file_path.unlink()
-                    logger.info(f"Deleted duplicate session file: {file_path}")
+                file_path.unlink(missing_ok=True)
+                logger.info("Deleted duplicate session file: %s", file_path)
             except Exception as e:
-                logger.error(f"Failed to delete session file {file_path}: {e}")
+                logger.error("Failed to delete session file %s: %s", file_path, e)
         
         logger.info(
-            f"SessionManager initialization complete: "
-            f"{loaded_count} tasks loaded, {error_count} errors"
+            "SessionManager initialization complete: %d tasks loaded, %d errors",
+            loaded_count, error_count
         )
     
     def _load_session_file(self, uuid: str) -> Optional[SessionData]:
@@ -221,8 +224,7 @@ class SessionManager:
             
         Raises:
             FileNotFoundError: If the session file does not exist
-            json.JSONDecodeError: If the file contains invalid JSON
-            ValidationError: If the data doesn't match SessionData schema
+            ValidationError: If the file contains invalid JSON or doesn't match SessionData schema
         """
         file_path = self.data_dir / f"{uuid}.json"
         
@@ -230,28 +232,51 @@ class SessionManager:
             raise FileNotFoundError(f"Session file not found: {file_path}")
         
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            with open(file_path, 'rb') as f:
+                raw = f.read()
             
-            # Parse and validate with Pydantic
-            session_data = SessionData(**data)
+            # Parse and validate in one step inside pydantic-core
+            session_data = SessionData.model_validate_json(raw)
             
-            logger.debug(f"Loaded session file: {uuid}")
+            logger.debug("Loaded session file: %s", uuid)
             return session_data
             
-        except json.JSONDecodeError as e:
-            logger.error(f"Invalid JSON in session file {file_path}: {e}")
-            raise
         except ValidationError as e:
-            logger.error(f"Invalid session data in {file_path}: {e}")
+            logger.error("Invalid session data in %s: %s", file_path, e)
             raise
         except PermissionError as e:
-            logger.error(f"Permission denied reading {file_path}: {e}")
+            logger.error("Permission denied reading %s: %s", file_path, e)
             raise
         except Exception as e:
-            logger.error(f"Unexpected error loading {file_path}: {e}")
+            logger.error("Unexpected error loading %s: %s", file_path, e)
             raise
     
+    def _encode_session(self, session_data: SessionData) -> bytes:
+        """
+        Encode a session to JSON bytes.
+        The immutable fields (including the session_string) are encoded once per
+        task and cached, so a save only encodes the mutable heartbeat state.
+        
+        Args:
+            session_data: SessionData object to encode
+            
+        Returns:
+            bytes: JSON document for the session file
+        """
+        prefix = self._static_json.get(session_data.uuid)
+        if prefix is None:
+            prefix = orjson.dumps(session_data.model_dump(exclude=_MUTABLE_FIELDS))[:-1]
+            self._static_json[session_data.uuid] = prefix
+        
+        return b"".join((
+            prefix,
+            b',"consecutive_failures":',
+            b"%d" % session_data.consecutive_failures,
+            b',"last_heartbeat":',
+            orjson.dumps(session_data.last_heartbeat),
+            b"}"
+        ))
+    
     def _write_json_file(self, file_path: Path, session_data: SessionData):
         """
         Synchronous method to write session data to a JSON file.
@@ -266,23 +291,31 @@ class SessionManager:
             OSError: If other file system errors occur
         """
         try:
-            # Convert to dict and handle datetime serialization
-            data = session_data.model_dump(mode='json')
+            buf = self._encode_session(session_data)
             
-            # Write to file
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
+            # Write to a temp file and swap it in, so a crash mid-write never
+            # leaves a truncated session file behind
+            tmp_path = file_path.with_suffix(file_path.suffix + '.tmp')
+            try:
+                with open(tmp_path, 'wb') as f:
+                    f.write(buf)
+                os.replace(tmp_path, file_path)
+            except BaseException:
+                # Don't leave a stray <uuid>.json.tmp behind; keep the original error
+                with suppress(OSError):
+                    tmp_path.unlink(missing_ok=True)
+                raise
             
-            logger.debug(f"Saved session file: {session_data.uuid}")
+            logger.debug("Saved session file: %s", session_data.uuid)
             
         except PermissionError as e:
-            logger.error(f"Permission denied writing to {file_path}: {e}")
+            logger.error("Permission denied writing to %s: %s", file_path, e)
             raise
         except OSError as e:
-            logger.error(f"File system error writing to {file_path}: {e}")
+            logger.error("File system error writing to %s: %s", file_path, e)
             raise
         except Exception as e:
-            logger.error(f"Unexpected error saving {file_path}: {e}")
+            logger.error("Unexpected error saving %s: %s", file_path, e)
             raise
     
     async def _save_session_file(self, session_data: SessionData):
@@ -304,6 +337,90 @@ class SessionManager:
             # Use asyncio.to_thread to execute I/O in thread pool
             await asyncio.to_thread(self._write_json_file, file_path, session_data)
     
+    def _schedule_save(self, uuid: str):
+        """
+        Schedule a debounced save of the session file.
+        Calls made while a save is already pending are merged into it, and the
+        write uses whatever the in-memory state is when the timer fires.
+        
+        Args:
+            uuid: UUID of the session to save
+        """
+        if uuid in self._pending_saves:
+            return
+        
+        loop = asyncio.get_running_loop()
+        self._pending_saves[uuid] = loop.call_later(
+            SAVE_DEBOUNCE_SECONDS, self._start_flush, uuid
+        )
+    
+    def _start_flush(self, uuid: str):
+        """
+        Timer callback that starts the pending save for the given UUID.
+        
+        Args:
+            uuid: UUID of the session to save
+        """
+        self._pending_saves.pop(uuid, None)
+        task = asyncio.create_task(self._flush_save(uuid))
+        self._flush_tasks.add(task)
+        task.add_done_callback(self._flush_tasks.discard)
+    
+    async def _flush_save(self, uuid: str):
+        """
+        Write the current in-memory state of a session to disk.
+        Skips the write if the task was cleaned up in the meantime.
+        
+        Args:
+            uuid: UUID of the session to save
+        """
+        # Checked before taking the lock so a save scheduled by a heartbeat that
+        # finished after cleanup doesn't recreate the evicted lock
+        if uuid not in self.sessions:
+            return
+        
+        file_path = self.data_dir / f"{uuid}.json"
+        lock = self._get_file_lock(uuid)
+        
+        async with lock:
+            # Re-checked: cleanup may have run while waiting for the lock
+            session_data = self.sessions.get(uuid)
+            if session_data is None:
+                return
+            
+            try:
+                await asyncio.to_thread(self._write_json_file, file_path, session_data)
+            except Exception as e:
+                logger.error("Failed to save session file for %s: %s", uuid, e)
+    
+    def _cancel_pending_save(self, uuid: str):
+        """
+        Drop a pending debounced save for the given UUID, if any.
+        
+        Args:
+            uuid: UUID of the session
+        """
+        handle = self._pending_saves.pop(uuid, None)
+        if handle is not None:
+            handle.cancel()
+    
+    async def flush_pending_saves(self):
+        """
+        Immediately write all debounced saves to disk.
+        Should be awaited on shutdown so no heartbeat state is lost.
+        """
+        uuids = list(self._pending_saves)
+        for uuid in uuids:
+            self._cancel_pending_save(uuid)
+        
+        await asyncio.gather(
+            *(self._flush_save(uuid) for uuid in uuids),
+            *self._flush_tasks
+        )
+        
+        if uuids:
+            logger.info("Flushed %s pending session saves", len(uuids))
+    
     async def create_task(self, session_string: str, notify_chat_id: int) -> str:
         """
         Create a new keepalive task.
@@ -322,15 +439,19 @@ class SessionManager:
         logger.info("Creating new keepalive task")
         
         # Validate session and get account info
-        logger.debug(f"Validating session: {mask_sensitive_data(session_string)}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Validating session: %s", mask_sensitive_data(session_string))
         account_info = await self.telegram_client.validate_session(session_string)
         tg_id = account_info['tg_id']
         
         # Check if a task already exists for this TG_ID
         if tg_id in self.tg_id_to_uuid:
             old_uuid = self.tg_id_to_uuid[tg_id]
-            logger.info(f"Found existing task for tg_id {tg_id}: {old_uuid}, will replace it")
-            await self.cleanup_task(old_uuid, "被新任务替换")
+            logger.info("Found existing task for tg_id %s: %s, will replace it", tg_id, old_uuid)
+            try:
+                await self.cleanup_task(old_uuid, "被新任务替换")
+            except KeyError:
+                logger.warning("Existing task %s was already cleaned up", old_uuid)
         
         # Generate unique UUID
         task_uuid = str(uuid_module.uuid4())
@@ -358,7 +479,7 @@ class SessionManager:
         # Start heartbeat task
         await self.start_heartbeat(task_uuid)
         
-        logger.info(f"Created task {task_uuid} for user {tg_id}")
+        logger.info("Created task %s for user %s", task_uuid, tg_id)
         return task_uuid
     
     async def start_heartbeat(self, uuid: str):
@@ -369,24 +490,25 @@ class SessionManager:
             uuid: UUID of the task to start
         """
         if uuid not in self.sessions:
-            logger.error(f"Cannot start heartbeat: session {uuid} not found")
+            logger.error("Cannot start heartbeat: session %s not found", uuid)
             return
         
-        # Calculate first execution time (current time + interval + jitter)
-        interval_seconds = self._calculate_next_interval()
-        first_run_time = datetime.now() + timedelta(seconds=interval_seconds)
-        
-        # Use date trigger to schedule first execution
+        # Interval trigger: APScheduler keeps the fire times on its own timer
+        # and adds 0..jitter_seconds of random delay to each run
         self.scheduler.add_job(
-            self._execute_heartbeat_and_reschedule,
-            'date',
-            run_date=first_run_time,
+            self.execute_heartbeat,
+            'interval',
+            seconds=self.config.interval_seconds,
+            jitter=self.config.jitter_seconds,
             id=uuid,
             args=[uuid],
             replace_existing=True
         )
         
-        logger.info(f"Scheduled first heartbeat for {uuid} at {first_run_time}")
+        logger.info(
+            "Scheduled heartbeat for %s every %ss (jitter up to %ss)",
+            uuid, self.config.interval_seconds, self.config.jitter_seconds
+        )
     
     async def stop_heartbeat(self, uuid: str):
         """
@@ -397,20 +519,34 @@ class SessionManager:
         """
         try:
             self.scheduler.remove_job(uuid)
-            logger.info(f"Stopped heartbeat task for {uuid}")
+            logger.info("Stopped heartbeat task for %s", uuid)
         except Exception as e:
-            logger.warning(f"Failed to stop heartbeat task {uuid}: {e}")
+            logger.warning("Failed to stop heartbeat task %s: %s", uuid, e)
     
-    def _calculate_next_interval(self) -> int:
+    def get_task_view(self, uuid: str) -> Optional[dict]:
         """
-        Calculate the next heartbeat interval with random jitter.
+        Build the public view of a task from the in-memory session.
+        Field values keep their model types (timestamps stay datetime objects),
+        so the response model can take them without re-parsing.
         
+        Args:
+            uuid: UUID of the task
+            
         Returns:
-            Interval in seconds (base interval + random jitter)
+            dict with the task fields, or None if the task is not loaded
         """
-        jitter = random.randint(0, self.config.jitter_seconds)
-        interval = self.config.interval_seconds + jitter
-        return interval
+        session_data = self.sessions.get(uuid)
+        if session_data is None:
+            return None
+        
+        return {
+            'session_string': session_data.session_string,
+            'tg_id': session_data.tg_id,
+            'notify_chat_id': session_data.notify_chat_id,
+            'created_at': session_data.created_at,
+            'last_heartbeat': session_data.last_heartbeat,
+            'consecutive_failures': session_data.consecutive_failures
+        }
     
     def _get_file_lock(self, uuid: str) -> asyncio.Lock:
         """
@@ -426,32 +562,6 @@ class SessionManager:
             self._file_locks[uuid] = asyncio.Lock()
         return self._file_locks[uuid]
     
-    async def _execute_heartbeat_and_reschedule(self, uuid: str):
-        """
-        Execute a heartbeat operation and reschedule the next execution.
-        
-        Args:
-            uuid: UUID of the task to execute heartbeat for
-        """
-        # Execute the heartbeat
-        await self.execute_heartbeat(uuid)
-        
-        # If task still exists, schedule next execution
-        if uuid in self.sessions:
-            interval_seconds = self._calculate_next_interval()
-            next_run_time = datetime.now() + timedelta(seconds=interval_seconds)
-            
-            self.scheduler.add_job(
-                self._execute_heartbeat_and_reschedule,
-                'date',
-                run_date=next_run_time,
-                id=uuid,
-                args=[uuid],
-                replace_existing=True
-            )
-            
-            logger.info(f"Scheduled next heartbeat for {uuid} at {next_run_time}")
-    
     async def execute_heartbeat(self, uuid: str):
         """
         Execute a heartbeat operation for the given task.
@@ -459,42 +569,42 @@ class SessionManager:
         Args:
             uuid: UUID of the task to execute heartbeat for
         """
-        logger.info(f"Executing heartbeat for task {uuid}")
+        logger.info("Executing heartbeat for task %s", uuid)
         
-        if uuid not in self.sessions:
-            logger.error(f"Cannot execute heartbeat: session {uuid} not found")
+        session_data = self.sessions.get(uuid)
+        if session_data is None:
+            logger.error("Cannot execute heartbeat: session %s not found", uuid)
             return
         
-        session_data = self.sessions[uuid]
-        
         try:
             # Execute heartbeat
-            logger.debug(f"Executing heartbeat for session: {mask_sensitive_data(session_data.session_string)}")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Executing heartbeat for session: %s", mask_sensitive_data(session_data.session_string))
             success = await self.telegram_client.heartbeat(session_data.session_string)
             
             if success:
-                await self._handle_success(uuid)
+                await self._handle_success(session_data)
             else:
-                await self._handle_failure(uuid, Exception("Heartbeat returned False"))
+                await self._handle_failure(session_data, Exception("Heartbeat returned False"))
                 
         except Exception as e:
-            await self._handle_failure(uuid, e)
+            await self._handle_failure(session_data, e)
     
-    async def _handle_success(self, uuid: str):
+    async def _handle_success(self, session_data: SessionData):
         """
         Handle successful heartbeat operation.
         
         Args:
-            uuid: UUID of the task
+            session_data: Cached SessionData of the task
         """
-        session_data = self.sessions[uuid]
+        uuid = session_data.uuid
         
         # Reset failure count and update last heartbeat
         session_data.consecutive_failures = 0
         session_data.last_heartbeat = datetime.utcnow()
         
-        # Save to disk asynchronously
-        await self._save_session_file(session_data)
+        # Persist the new state (debounced)
+        self._schedule_save(uuid)
         
         # Send success notification
         await self.bot_notifier.send_success(
@@ -502,23 +612,25 @@ class SessionManager:
             uuid
         )
         
-        logger.info(f"Heartbeat success for task {uuid}")
+        logger.info("Heartbeat success for task %s", uuid)
     
-    async def _handle_failure(self, uuid: str, error: Exception):
+    async def _handle_failure(self, session_data: SessionData, error: Exception):
         """
         Handle failed heartbeat operation.
         
         Args:
-            uuid: UUID of the task
+            session_data: Cached SessionData of the task
             error: Exception that caused the failure
         """
-        session_data = self.sessions[uuid]
+        uuid = session_data.uuid
         
         # Increment failure count
         session_data.consecutive_failures += 1
+        threshold_reached = session_data.consecutive_failures >= self.config.max_failures
         
-        # Save to disk asynchronously
-        await self._save_session_file(session_data)
+        # Persist the new state (debounced), unless the file is about to be deleted
+        if not threshold_reached:
+            self._schedule_save(uuid)
         
         # Send failure notification
         await self.bot_notifier.send_failure(
@@ -528,14 +640,17 @@ class SessionManager:
         )
         
         logger.warning(
-            f"Heartbeat failure for task {uuid}: "
-            f"{session_data.consecutive_failures}/{self.config.max_failures}"
+            "Heartbeat failure for task %s: %d/%d",
+            uuid, session_data.consecutive_failures, self.config.max_failures
         )
         
         # Check if we've reached the failure threshold
-        if session_data.consecutive_failures >= self.config.max_failures:
+        if threshold_reached:
             reason = f"连续失败 {self.config.max_failures} 次"
-            await self.cleanup_task(uuid, reason)
+            try:
+                await self.cleanup_task(uuid, reason)
+            except KeyError:
+                logger.warning("Cannot cleanup: session %s not found", uuid)
     
     async def cleanup_task(self, uuid: str, reason: str):
         """
@@ -545,14 +660,17 @@ class SessionManager:
         Args:
             uuid: UUID of the task to clean up
             reason: Reason for cleanup
+            
+        Raises:
+            KeyError: If no task with this UUID exists
         """
-        logger.info(f"Cleaning up task {uuid}: {reason}")
+        # Taken out of the cache first, so concurrent cleanups of the same
+        # task cannot both proceed
+        session_data = self.sessions.pop(uuid, None)
+        if session_data is None:
+            raise KeyError(uuid)
         
-        if uuid not in self.sessions:
-            logger.warning(f"Cannot cleanup: session {uuid} not found")
-            return
-        
-        session_data = self.sessions[uuid]
+        logger.info("Cleaning up task %s: %s", uuid, reason)
         
         # Send cleanup notification
         await self.bot_notifier.send_cleanup(
@@ -564,27 +682,31 @@ class SessionManager:
         # Stop heartbeat task
         await self.stop_heartbeat(uuid)
         
-        # Delete session file
+        # Drop any pending save so the file isn't rewritten after deletion
+        self._cancel_pending_save(uuid)
+        
+        # Delete session file (under the file lock so an in-flight save finishes first)
         file_path = self.data_dir / f"{uuid}.json"
-        try:
-            if file_path.exists():
-                file_path.unlink()
-                logger.info(f"Deleted session file: {file_path}")
-        except Exception as e:
-            logger.error(f"Failed to delete session file {file_path}: {e}")
+        async with self._get_file_lock(uuid):
+            try:
+                file_path.unlink(missing_ok=True)
+                logger.info("Deleted session file: %s", file_path)
+            except Exception as e:
+                logger.error("Failed to delete session file %s: %s", file_path, e)
         
-        # Remove from cache
-        del self.sessions[uuid]
+        # Drop per-task caches
+        self._file_locks.pop(uuid, None)
+        self._static_json.pop(uuid, None)
         
         # Clean up TG_ID mapping (verify UUID matches before removing)
         if session_data.tg_id in self.tg_id_to_uuid:
             if self.tg_id_to_uuid[session_data.tg_id] == uuid:
                 del self.tg_id_to_uuid[session_data.tg_id]
-                logger.debug(f"Removed TG_ID mapping for {session_data.tg_id}")
+                logger.debug("Removed TG_ID mapping for %s", session_data.tg_id)
             else:
                 logger.warning(
-                    f"TG_ID mapping mismatch for {session_data.tg_id}: "
-                    f"expected {uuid}, found {self.tg_id_to_uuid[session_data.tg_id]}"
+                    "TG_ID mapping mismatch for %s: expected %s, found %s",
+                    session_data.tg_id, uuid, self.tg_id_to_uuid[session_data.tg_id]
                 )
         
-        logger.info(f"Task {uuid} cleaned up successfully")
+        logger.info("Task %s cleaned up successfully", uuid)
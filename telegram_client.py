@@ -5,9 +5,13 @@ Provides methods for login, session validation, code listening, and heartbeat.
 
 import asyncio
 import logging
+import random
 import re
-from functools import wraps
-from typing import Dict, Optional
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from functools import partial, wraps
+from typing import Dict, List, Optional, Tuple, Union
 
 from telethon import TelegramClient, events
 from telethon.errors import (
@@ -19,10 +23,34 @@ from telethon.errors import (
     PasswordHashInvalidError,
 )
 from telethon.sessions import StringSession
+from telethon.tl.functions.users import GetUsersRequest
+from telethon.tl.types import InputUserSelf
 
 
 logger = logging.getLogger(__name__)
 
+# Pooled clients unused for longer than this are disconnected (seconds)
+CLIENT_IDLE_TIMEOUT = 600
+# Maximum number of pooled connected clients (least recently used are dropped)
+CLIENT_POOL_SIZE = 1024
+
+# Token bucket per kind of request: (requests per second, burst capacity);
+# Telegram limits login RPCs much more tightly than read-only calls like get_me
+METHOD_RATE_LIMITS = {
+    'get_me': (20.0, 10),
+    'send_code_request': (1.0, 1),
+    'sign_in': (2.0, 1),
+}
+
+# Attempts per call when Telegram answers with FloodWaitError
+FLOOD_MAX_ATTEMPTS = 3
+
+# 5-6 digit login codes in messages from Telegram (777000)
+_CODE_RE = re.compile(r'\b(\d{5,6})\b')
+# Telegram puts the code in the first line of its login message; only that
+# prefix is searched so the regex work stays bounded for long templates
+CODE_SEARCH_LIMIT = 128
+
 
 def mask_sensitive_data(data: str, visible_chars: int = 10) -> str:
     """
@@ -42,60 +70,157 @@ def mask_sensitive_data(data: str, visible_chars: int = 10) -> str:
     return data[:visible_chars] + "..."
 
 
-class RateLimiter:
-    """简单的速率限制器，确保相邻请求之间的最小间隔"""
+class LazyMask:
+    """
+    延迟遮蔽：作为日志参数传入，仅在日志记录真正输出时才执行 mask_sensitive_data
+    """
+    __slots__ = ('data',)
+    
+    def __init__(self, data: str):
+        self.data = data
+    
+    def __str__(self) -> str:
+        return mask_sensitive_data(self.data)
+
+
+class TokenBucket:
+    """令牌桶速率限制器：允许短时突发，持续负载下按固定速率放行"""
     
-    def __init__(self, min_interval: float):
+    def __init__(self, rate: float, capacity: int):
         """
-        初始化速率限制器
+        初始化令牌桶
         
         Args:
-            min_interval: 相邻请求之间的最小间隔（秒）
+            rate: 每秒补充的令牌数
+            capacity: 桶容量（允许的最大突发请求数）
         """
-        self.min_interval = min_interval
-        self._last_request_time = 0.0
-        self._lock = asyncio.Lock()
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        # 上次补充令牌的时间点（time.monotonic）
+        self._updated = 0.0
     
-    async def wait(self):
-        """等待直到可以发起下一个请求"""
-        async with self._lock:
-            current_time = asyncio.get_event_loop().time()
-            time_since_last = current_time - self._last_request_time
-            
-            if time_since_last < self.min_interval:
-                await asyncio.sleep(self.min_interval - time_since_last)
-            
-            self._last_request_time = asyncio.get_event_loop().time()
+    async def acquire(self):
+        """
+        取走一个令牌，桶空时等待
+        
+        令牌数可以为负，表示已被预约的未来令牌；调用方同步完成预约后
+        只睡眠到自己的令牌生成为止，无需加锁，也不会在同一时刻集中唤醒
+        """
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        self._tokens -= 1
+        
+        if self._tokens < 0:
+            await asyncio.sleep(-self._tokens / self.rate)
+
+
+class DynamicLimiter:
+    """并发限制器，上限可在运行时安全调整（asyncio.Semaphore 不支持）"""
+    
+    def __init__(self, max_concurrent: int):
+        """
+        初始化并发限制器
+        
+        Args:
+            max_concurrent: 最大并发数
+        """
+        self.max_concurrent = max_concurrent
+        self._active = 0
+        self._waiters: deque = deque()
+    
+    async def acquire(self):
+        """等待直到当前并发数低于上限，然后占用一个名额"""
+        if not self._waiters and self._active < self.max_concurrent:
+            self._active += 1
+            return
+        
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append(future)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # 名额已在取消前分配给本等待者，转交给下一个
+                self.release()
+            else:
+                self._waiters.remove(future)
+            raise
+    
+    def release(self):
+        """释放一个名额并唤醒等待者（同步执行，可在 finally 中安全调用）"""
+        self._active -= 1
+        self._wake()
+    
+    def set_max(self, max_concurrent: int):
+        """
+        调整并发上限；已在执行的操作不受影响
+        
+        Args:
+            max_concurrent: 新的最大并发数（至少为 1）
+        """
+        self.max_concurrent = max(1, max_concurrent)
+        self._wake()
+    
+    def _wake(self):
+        """按 FIFO 顺序把空闲名额直接分配给等待者"""
+        while self._waiters and self._active < self.max_concurrent:
+            future = self._waiters.popleft()
+            if not future.done():
+                self._active += 1
+                future.set_result(None)
 
 
 def handle_telegram_errors(func):
     """
     Decorator to handle common Telegram API errors.
-    Automatically retries on FloodWaitError and converts errors to meaningful exceptions.
+    Retries on FloodWaitError (up to FLOOD_MAX_ATTEMPTS, with jitter) and converts
+    errors to meaningful exceptions.
+    
+    The first argument after self (phone, session string or login client) keys a
+    flood gate: while Telegram's wait is in effect, new calls for the same key
+    wait on the gate instead of hitting the API and flooding again.
     """
     @wraps(func)
     async def wrapper(*args, **kwargs):
-        try:
-            return await func(*args, **kwargs)
-        except FloodWaitError as e:
-            logger.warning(f"FloodWaitError: waiting {e.seconds} seconds")
-            await asyncio.sleep(e.seconds + 5)
-            return await func(*args, **kwargs)
-        except AuthKeyUnregisteredError:
-            logger.error("Session expired or invalid")
-            raise ValueError("Session expired or invalid")
-        except PhoneCodeInvalidError:
-            logger.error("Invalid verification code")
-            raise ValueError("Invalid verification code")
-        except PhoneCodeExpiredError:
-            logger.error("Verification code expired")
-            raise ValueError("Verification code expired")
-        except PasswordHashInvalidError:
-            logger.error("Invalid 2FA password")
-            raise ValueError("Invalid 2FA password")
-        except Exception as e:
-            logger.error(f"Unexpected error in {func.__name__}: {e}")
-            raise
+        owner = args[0] if args and isinstance(args[0], TelegramClientWrapper) else None
+        key = args[1] if len(args) > 1 else None
+        
+        for attempt in range(1, FLOOD_MAX_ATTEMPTS + 1):
+            if owner is not None:
+                await owner._wait_flood_gate(key)
+            
+            try:
+                return await func(*args, **kwargs)
+            except FloodWaitError as e:
+                if attempt == FLOOD_MAX_ATTEMPTS:
+                    logger.error("FloodWaitError in %s: giving up after %d attempts", func.__name__, attempt)
+                    raise
+                
+                delay = e.seconds + random.uniform(0, min(5, e.seconds * 0.1))
+                logger.warning(
+                    "FloodWaitError: waiting %.1f seconds (attempt %d/%d)",
+                    delay, attempt, FLOOD_MAX_ATTEMPTS
+                )
+                if owner is not None:
+                    await owner._on_flood_wait(e.seconds, key)
+                await asyncio.sleep(delay)
+            except AuthKeyUnregisteredError:
+                logger.error("Session expired or invalid")
+                raise ValueError("Session expired or invalid")
+            except PhoneCodeInvalidError:
+                logger.error("Invalid verification code")
+                raise ValueError("Invalid verification code")
+            except PhoneCodeExpiredError:
+                logger.error("Verification code expired")
+                raise ValueError("Verification code expired")
+            except PasswordHashInvalidError:
+                logger.error("Invalid 2FA password")
+                raise ValueError("Invalid 2FA password")
+            except Exception as e:
+                logger.error(f"Unexpected error in {func.__name__}: {e}")
+                raise
     return wrapper
 
 
@@ -103,6 +228,9 @@ class TelegramClientWrapper:
     """
     Wrapper class for Telethon client operations.
     Manages login flow, session validation, code listening, and heartbeat operations.
+    
+    All I/O goes through the running asyncio loop, so the uvloop loop set up by
+    web_server's entry point is picked up transparently; uvloop is not required.
     """
 
     def __init__(self, api_id: int, api_hash: str, max_concurrent: int = 10):
@@ -117,25 +245,290 @@ class TelegramClientWrapper:
         self.api_id = api_id
         self.api_hash = api_hash
         
+        # 统一的客户端构造入口：调用方只需传入 session
+        self._make_client = partial(TelegramClient, api_id=api_id, api_hash=api_hash)
+        
         # 添加并发和速率限制
-        self._semaphore = asyncio.Semaphore(max_concurrent)
-        self._rate_limiter = RateLimiter(min_interval=0.5)
+        self.max_concurrent = max_concurrent
+        self._limiter = DynamicLimiter(max_concurrent)
+        self._rate_limiters = {
+            method_key: TokenBucket(rate, capacity)
+            for method_key, (rate, capacity) in METHOD_RATE_LIMITS.items()
+        }
+        # FloodWait 期间并发上限减半，到期后（time.monotonic）恢复
+        self._limit_restore_at = 0.0
+        # FloodWait 闸门：key -> (Event, 重新开放的定时器)
+        self._flood_gates: Dict[object, Tuple[asyncio.Event, asyncio.TimerHandle]] = {}
+        
+        # 已连接客户端池：session_string -> (client, 最后使用时间)
+        self._client_pool: "OrderedDict[str, Tuple[TelegramClient, float]]" = OrderedDict()
+        # 连接锁：同一会话的并发未命中只建立一次连接
+        self._client_locks: Dict[str, asyncio.Lock] = {}
+        # 租用计数：正在使用中的客户端不会被淘汰
+        self._client_leases: Dict[str, int] = {}
+        
+        # 验证码分发表：session_string -> 等待验证码的 Future 列表
+        self._code_waiters: Dict[str, List[asyncio.Future]] = {}
+        # 已注册 777000 消息处理器的客户端：session_string -> client
+        self._code_handler_clients: Dict[str, TelegramClient] = {}
         
         logger.info(f"TelegramClientWrapper initialized with max_concurrent={max_concurrent}")
 
-    async def _with_limits(self, coro):
+    async def _get_client(self, session_string: str) -> TelegramClient:
+        """
+        从连接池获取已连接的客户端，未命中时创建并连接
+        
+        Args:
+            session_string: Telethon StringSession
+            
+        Returns:
+            TelegramClient: 已连接的客户端
+        """
+        client = self._pooled_client(session_string)
+        if client is not None:
+            return client
+        
+        lock = self._client_locks.get(session_string)
+        if lock is None:
+            lock = self._client_locks[session_string] = asyncio.Lock()
+        
+        async with lock:
+            # 等待锁期间可能已有其他调用方完成连接
+            client = self._pooled_client(session_string)
+            if client is not None:
+                return client
+            
+            client = self._make_client(StringSession(session_string))
+            try:
+                await client.connect()
+            except BaseException:
+                # 连接失败的会话不保留锁，避免无效会话的锁长期堆积
+                if self._client_locks.get(session_string) is lock:
+                    del self._client_locks[session_string]
+                raise
+            
+            self._client_pool[session_string] = (client, time.monotonic())
+            self._client_pool.move_to_end(session_string)
+        
+        # 超出容量时淘汰最久未使用且未被租用的客户端
+        while len(self._client_pool) > CLIENT_POOL_SIZE:
+            old_key = next(
+                (key for key in self._client_pool
+                 if key != session_string and key not in self._client_leases),
+                None
+            )
+            if old_key is None:
+                break
+            await self._evict_client(old_key)
+        
+        return client
+    
+    def _pooled_client(self, session_string: str) -> Optional[TelegramClient]:
+        """
+        连接池命中且仍处于连接状态时，刷新其使用时间并返回
+        
+        Args:
+            session_string: Telethon StringSession
+            
+        Returns:
+            TelegramClient 或 None（未命中或已断开）
+        """
+        entry = self._client_pool.get(session_string)
+        if entry is None or not entry[0].is_connected():
+            return None
+        
+        self._client_pool[session_string] = (entry[0], time.monotonic())
+        self._client_pool.move_to_end(session_string)
+        return entry[0]
+    
+    @asynccontextmanager
+    async def _session_client(self, session_string: str):
+        """
+        从连接池租用客户端；会话失效（AuthKeyUnregisteredError）时将其移出连接池
+        
+        Args:
+            session_string: Telethon StringSession
+            
+        Yields:
+            TelegramClient: 已连接的客户端（用完后留在池中复用）
+        """
+        client = await self._get_client(session_string)
+        self._client_leases[session_string] = self._client_leases.get(session_string, 0) + 1
+        try:
+            yield client
+        except AuthKeyUnregisteredError:
+            await self._evict_client(session_string)
+            raise
+        finally:
+            leases = self._client_leases.pop(session_string) - 1
+            if leases:
+                self._client_leases[session_string] = leases
+    
+    async def _evict_client(self, session_string: str):
+        """
+        从连接池移除并断开客户端（会话失效时调用）
+        
+        Args:
+            session_string: Telethon StringSession
+        """
+        entry = self._client_pool.pop(session_string, None)
+        self._code_handler_clients.pop(session_string, None)
+        self._client_locks.pop(session_string, None)
+        if entry is not None:
+            await self._disconnect_quietly(entry[0])
+    
+    @staticmethod
+    async def _disconnect_quietly(client: TelegramClient):
+        """断开客户端连接，忽略断开过程中的错误"""
+        try:
+            await client.disconnect()
+        except Exception as e:
+            logger.warning("Error disconnecting pooled client: %s", e)
+    
+    async def evict_idle_clients(self):
+        """
+        断开并移除空闲超过 CLIENT_IDLE_TIMEOUT 的客户端
+        由调度器定期调用
+        """
+        cutoff = time.monotonic() - CLIENT_IDLE_TIMEOUT
+        idle = [
+            key for key, (_, last_used) in self._client_pool.items()
+            if last_used < cutoff and key not in self._client_leases
+        ]
+        
+        for key in idle:
+            await self._evict_client(key)
+        
+        if idle:
+            logger.info("Evicted %d idle Telegram clients, %d remain", len(idle), len(self._client_pool))
+    
+    async def close(self):
+        """断开连接池中的所有客户端（应用关闭时调用）"""
+        clients = [client for client, _ in self._client_pool.values()]
+        self._client_pool.clear()
+        self._client_locks.clear()
+        self._code_handler_clients.clear()
+        await asyncio.gather(*(self._disconnect_quietly(client) for client in clients))
+    
+    def _ensure_code_handler(self, session_string: str, client: TelegramClient):
+        """
+        确保该客户端上注册了唯一的 777000 消息处理器
+        处理器提取验证码后分发给 _code_waiters 中该会话的所有等待者
+        
+        Args:
+            session_string: Telethon StringSession
+            client: 连接池中的客户端
+        """
+        if self._code_handler_clients.get(session_string) is client:
+            return
+        
+        async def handler(event):
+            waiters = self._code_waiters.get(session_string)
+            if not waiters:
+                return
+            
+            logger.info(f"Received message from 777000: {event.raw_text}")
+            
+            # Extract verification code from message
+            code = self._extract_verification_code(event.raw_text)
+            if not code:
+                return
+            
+            for future in waiters:
+                if not future.done():
+                    future.set_result(code)
+        
+        client.add_event_handler(handler, events.NewMessage(from_users=777000))
+        self._code_handler_clients[session_string] = client
+    
+    async def _wait_flood_gate(self, key):
+        """
+        如果该 key 正处于 FloodWait 等待期，等待闸门重新开放
+        
+        Args:
+            key: 闸门键（手机号、session_string 或登录客户端）
+        """
+        entry = self._flood_gates.get(key)
+        if entry is not None:
+            await entry[0].wait()
+    
+    def _close_flood_gate(self, key, seconds: int):
+        """
+        关闭该 key 的闸门，seconds 秒后重新开放（已关闭时只会延长）
+        
+        Args:
+            key: 闸门键
+            seconds: Telegram 要求的等待秒数
+        """
+        loop = asyncio.get_running_loop()
+        reopen_at = loop.time() + seconds
+        
+        entry = self._flood_gates.get(key)
+        if entry is None:
+            gate = asyncio.Event()
+        else:
+            gate, handle = entry
+            if handle.when() >= reopen_at:
+                return
+            handle.cancel()
+        
+        handle = loop.call_at(reopen_at, self._open_flood_gate, key, gate)
+        self._flood_gates[key] = (gate, handle)
+    
+    def _open_flood_gate(self, key, gate: asyncio.Event):
+        """定时器回调：重新开放闸门并唤醒所有等待者"""
+        del self._flood_gates[key]
+        gate.set()
+    
+    async def _on_flood_wait(self, seconds: int, key=None):
+        """
+        收到 FloodWaitError 时关闭对应闸门，并将并发上限减半，等待期结束后恢复
+        
+        Args:
+            seconds: Telegram 要求的等待秒数
+            key: 闸门键（None 时只调整并发上限）
+        """
+        if key is not None:
+            self._close_flood_gate(key, seconds)
+        
+        reduced = max(1, self._limiter.max_concurrent // 2)
+        self._limiter.set_max(reduced)
+        self._limit_restore_at = time.monotonic() + seconds
+        logger.warning("Concurrency limit reduced to %d for %d seconds", reduced, seconds)
+    
+    async def _with_limits(self, coro, method_key: str):
         """
         在并发和速率限制下执行协程
         
         Args:
             coro: 要执行的协程
+            method_key: 速率限制分组（METHOD_RATE_LIMITS 的键）
             
         Returns:
             协程的返回值
         """
-        async with self._semaphore:
-            await self._rate_limiter.wait()
+        if self._limit_restore_at and time.monotonic() >= self._limit_restore_at:
+            self._limit_restore_at = 0.0
+            self._limiter.set_max(self.max_concurrent)
+            logger.info("Concurrency limit restored to %d", self.max_concurrent)
+        
+        try:
+            await self._limiter.acquire()
+        except BaseException:
+            coro.close()
+            raise
+        
+        try:
+            await self._rate_limiters[method_key].acquire()
+        except BaseException:
+            self._limiter.release()
+            coro.close()
+            raise
+        
+        try:
             return await coro
+        finally:
+            self._limiter.release()
 
     @handle_telegram_errors
     async def start_login(self, phone: str) -> tuple[Dict[str, str], TelegramClient]:
@@ -156,12 +549,12 @@ class TelegramClientWrapper:
         logger.info(f"Starting login for phone: {phone}")
         
         # Create a new client for this login session
-        client = TelegramClient(StringSession(), self.api_id, self.api_hash)
+        client = self._make_client(StringSession())
         await client.connect()
         
         try:
             # Send code request
-            sent_code = await client.send_code_request(phone)
+            sent_code = await self._with_limits(client.send_code_request(phone), 'send_code_request')
             
             logger.info(f"Verification code sent to {phone}")
             return (
@@ -201,7 +594,10 @@ class TelegramClientWrapper:
         
         try:
             # Sign in with the code
-            user = await client.sign_in(phone, code, phone_code_hash=phone_code_hash)
+            user = await self._with_limits(
+                client.sign_in(phone, code, phone_code_hash=phone_code_hash),
+                'sign_in'
+            )
             
             # Login successful, get the session string
             session_string = client.session.save()
@@ -221,6 +617,9 @@ class TelegramClientWrapper:
             return {
                 "status": "password_required"
             }
+        except FloodWaitError:
+            # Keep the login client connected: handle_telegram_errors retries with it
+            raise
         except Exception as e:
             # Clean up on error
             await client.disconnect()
@@ -248,7 +647,7 @@ class TelegramClientWrapper:
         
         try:
             # Sign in with password
-            user = await client.sign_in(password=password)
+            user = await self._with_limits(client.sign_in(password=password), 'sign_in')
             
             # Get the session string
             session_string = client.session.save()
@@ -262,6 +661,9 @@ class TelegramClientWrapper:
                 "session_string": session_string,
                 "tg_id": user.id
             }
+        except FloodWaitError:
+            # Keep the login client connected: handle_telegram_errors retries with it
+            raise
         except Exception as e:
             # Clean up on error
             await client.disconnect()
@@ -284,18 +686,14 @@ class TelegramClientWrapper:
         logger.info("Validating session")
         
         async def _do_validate():
-            client = TelegramClient(StringSession(session_string), self.api_id, self.api_hash)
-            
-            try:
-                await client.connect()
-                
+            async with self._session_client(session_string) as client:
                 # Call get_me to validate session and get account info
                 me = await client.get_me()
                 
                 if not me:
                     raise ValueError("Invalid session: unable to retrieve account information")
                 
-                logger.info(f"Session validated for user {me.id}, session: {mask_sensitive_data(session_string)}")
+                logger.info("Session validated for user %s, session: %s", me.id, LazyMask(session_string))
                 
                 result = {
                     "tg_id": me.id,
@@ -306,10 +704,25 @@ class TelegramClientWrapper:
                 }
                 
                 return result
-            finally:
-                await client.disconnect()
         
-        return await self._with_limits(_do_validate())
+        return await self._with_limits(_do_validate(), 'get_me')
+
+    async def validate_sessions(self, session_strings: List[str]) -> List[Union[Dict[str, any], Exception]]:
+        """
+        Validate many StringSessions concurrently.
+        Concurrency and pacing are still bounded by _with_limits.
+
+        Args:
+            session_strings: Telethon StringSessions to validate
+
+        Returns:
+            List in input order; each item is the validate_session result dict,
+            or the exception raised for that session
+        """
+        return await asyncio.gather(
+            *(self.validate_session(s) for s in session_strings),
+            return_exceptions=True
+        )
 
     @handle_telegram_errors
     async def listen_for_code(self, session_string: str, timeout: int = 300) -> Optional[str]:
@@ -329,43 +742,40 @@ class TelegramClientWrapper:
         logger.info("Starting to listen for verification code")
         
         async def _do_listen():
-            client = TelegramClient(StringSession(session_string), self.api_id, self.api_hash)
-            code_received = asyncio.Event()
-            verification_code = None
+            code_future = asyncio.get_running_loop().create_future()
             
-            try:
-                await client.connect()
-                await client.start()
-                
-                @client.on(events.NewMessage(from_users=777000))
-                async def handler(event):
-                    nonlocal verification_code
-                    logger.info(f"Received message from 777000: {event.raw_text}")
-                    
-                    # Extract verification code from message
-                    code = self._extract_verification_code(event.raw_text)
-                    if code:
-                        verification_code = code
-                        code_received.set()
+            async with self._session_client(session_string) as client:
+                # Registered before the authorization round trip so no update is missed
+                self._ensure_code_handler(session_string, client)
+                waiters = self._code_waiters.setdefault(session_string, [])
+                waiters.append(code_future)
                 
-                # Wait for code or timeout
                 try:
-                    await asyncio.wait_for(code_received.wait(), timeout=timeout)
-                    logger.info(f"Verification code received: {verification_code}")
-                    return verification_code
-                except asyncio.TimeoutError:
-                    logger.warning(f"Timeout waiting for verification code after {timeout} seconds")
-                    return None
-            finally:
-                await client.disconnect()
+                    # 已有的 StringSession 只需确认已授权，不需要 start() 的交互式登录流程
+                    if not await client.is_user_authorized():
+                        raise AuthKeyUnregisteredError(request=None)
+                    
+                    # Wait for code or timeout
+                    try:
+                        verification_code = await asyncio.wait_for(code_future, timeout=timeout)
+                        logger.info(f"Verification code received: {verification_code}")
+                        return verification_code
+                    except asyncio.TimeoutError:
+                        logger.warning(f"Timeout waiting for verification code after {timeout} seconds")
+                        return None
+                finally:
+                    # 处理器留在池中的客户端上复用，只移除本次的等待者
+                    waiters.remove(code_future)
+                    if not waiters:
+                        del self._code_waiters[session_string]
         
-        return await self._with_limits(_do_listen())
+        return await self._with_limits(_do_listen(), 'get_me')
 
     @staticmethod
     def _extract_verification_code(message: str) -> Optional[str]:
         """
         Extract verification code from Telegram message.
-        Looks for 5-6 digit codes in the message.
+        Looks for 5-6 digit codes in the first CODE_SEARCH_LIMIT characters.
 
         Args:
             message: Message text from Telegram
@@ -373,9 +783,12 @@ class TelegramClientWrapper:
         Returns:
             Verification code as string, or None if not found
         """
-        # Pattern to match 5-6 digit codes
-        pattern = r'\b(\d{5,6})\b'
-        match = re.search(pattern, message)
+        match = _CODE_RE.search(message, 0, CODE_SEARCH_LIMIT)
+        
+        # endpos counts as a word boundary, so a longer digit run crossing the
+        # limit would be cut into a false code; re-match such a hit on the full text
+        if match and match.end() == CODE_SEARCH_LIMIT:
+            match = _CODE_RE.match(message, match.start())
         
         if match:
             return match.group(1)
@@ -385,7 +798,7 @@ class TelegramClientWrapper:
     async def heartbeat(self, session_string: str) -> bool:
         """
         Execute a heartbeat operation to keep the session alive.
-        Calls get_me() to verify the session is still valid.
+        Calls users.getUsers([InputUserSelf]) to verify the session is still valid.
 
         Args:
             session_string: Telethon StringSession
@@ -399,24 +812,37 @@ class TelegramClientWrapper:
         logger.info("Executing heartbeat")
         
         async def _do_heartbeat():
-            client = TelegramClient(StringSession(session_string), self.api_id, self.api_hash)
-            
             try:
-                await client.connect()
-                
-                # Call get_me as heartbeat
-                me = await client.get_me()
-                
-                if not me:
-                    logger.error("Heartbeat failed: unable to retrieve account information")
-                    return False
-                
-                logger.info(f"Heartbeat successful for user {me.id}, session: {mask_sensitive_data(session_string)}")
-                return True
+                async with self._session_client(session_string) as client:
+                    # Raw users.getUsers([self]) as heartbeat; skips get_me()'s
+                    # input-peer caching since only the round trip matters here
+                    users = await client(GetUsersRequest([InputUserSelf()]))
+                    
+                    if not users:
+                        logger.error("Heartbeat failed: unable to retrieve account information")
+                        return False
+                    
+                    logger.info("Heartbeat successful for user %s, session: %s", users[0].id, LazyMask(session_string))
+                    return True
             except Exception as e:
                 logger.error(f"Heartbeat failed: {e}")
                 raise
-            finally:
-                await client.disconnect()
         
-        return await self._with_limits(_do_heartbeat())
+        return await self._with_limits(_do_heartbeat(), 'get_me')
+
+    async def heartbeat_many(self, session_strings: List[str]) -> List[Union[bool, Exception]]:
+        """
+        Execute heartbeats for many sessions concurrently.
+        Concurrency and pacing are still bounded by _with_limits.
+
+        Args:
+            session_strings: Telethon StringSessions
+
+        Returns:
+            List in input order; each item is the heartbeat result,
+            or the exception raised for that session
+        """
+        return await asyncio.gather(
+            *(self.heartbeat(s) for s in session_strings),
+            return_exceptions=True
+        )
@@ -7,23 +7,36 @@ Provides three main functionalities:
 3. Receive verification codes via SSE
 """
 
+import atexit
 import logging
 import logging.handlers
 import os
+import queue
 import time
 import json
 import asyncio
 import sys
 import secrets
+import signal
 import re
+from collections import OrderedDict
 from contextlib import asynccontextmanager
-from typing import Dict
+from typing import Dict, Tuple
 from pathlib import Path
 from dataclasses import dataclass
 
+try:
+    import uvloop
+except ImportError:  # uvloop is not available on Windows
+    uvloop = None
+
+import orjson
+import uvicorn
 from fastapi import FastAPI, HTTPException, status, Query
-from fastapi.responses import JSONResponse, HTMLResponse, FileResponse, RedirectResponse
+from fastapi.responses import Response, JSONResponse, HTMLResponse, FileResponse, RedirectResponse
 from fastapi.staticfiles import StaticFiles
+from pydantic import ValidationError
+from starlette.middleware.gzip import GZipMiddleware
 from sse_starlette.sse import EventSourceResponse
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from telethon import TelegramClient, events
@@ -36,10 +49,34 @@ from models import (
     LoginPasswordRequest,
     CreateTaskRequest,
     ValidateSessionRequest,
+    TaskInfoResponse,
 )
 from telegram_client import TelegramClientWrapper
 from session_manager import SessionManager, Config
-from bot_notifier import BotNotifier
+from bot_notifier import BotNotifier, get_notifier
+
+
+class ORJSONResponse(JSONResponse):
+    """JSON 响应，使用 orjson 序列化"""
+    
+    def render(self, content) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+
+class CachedStaticFiles(StaticFiles):
+    """
+    静态文件服务，附加 Cache-Control 响应头
+    
+    静态资源文件名不带版本号，因此要求浏览器每次用 ETag/Last-Modified
+    重新验证，未修改时只返回 304 而不重新传输文件内容
+    """
+    
+    cache_control = "no-cache"
+    
+    def file_response(self, *args, **kwargs):
+        response = super().file_response(*args, **kwargs)
+        response.headers.setdefault("cache-control", self.cache_control)
+        return response
 
 
 @dataclass
@@ -71,6 +108,10 @@ def mask_sensitive_data(data: str, visible_chars: int = 10) -> str:
     return data[:visible_chars] + "..."
 
 
+# 标准 8-4-4-4-12 UUID 格式
+_UUID_RE = re.compile(r'[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}', re.IGNORECASE)
+
+
 def validate_uuid_format(uuid: str) -> bool:
     """
     验证 UUID 格式
@@ -81,17 +122,19 @@ def validate_uuid_format(uuid: str) -> bool:
     Returns:
         bool: 如果符合标准 UUID 格式返回 True，否则返回 False
     """
-    uuid_pattern = r'^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}\Z'
-    return bool(re.match(uuid_pattern, uuid, re.IGNORECASE))
+    # 长度不符时无需进入正则匹配
+    if len(uuid) != 36:
+        return False
+    return _UUID_RE.fullmatch(uuid) is not None
 
 
-def validate_safe_path(uuid: str, data_dir: str) -> Path:
+def validate_safe_path(uuid: str, data_dir: Path) -> Path:
     """
     验证路径安全性，防止路径遍历
     
     Args:
         uuid: 任务 UUID
-        data_dir: 数据目录路径
+        data_dir: 已解析的数据目录绝对路径
         
     Returns:
         Path: 解析后的安全路径
@@ -104,19 +147,39 @@ def validate_safe_path(uuid: str, data_dir: str) -> Path:
         raise ValueError("Invalid UUID format")
     
     # 构造并解析路径
-    session_file_path = (Path(data_dir) / f"{uuid}.json").resolve()
-    data_dir_resolved = Path(data_dir).resolve()
+    session_file_path = (data_dir / f"{uuid}.json").resolve()
     
     # 确保路径在 data_dir 内
-    if not str(session_file_path).startswith(str(data_dir_resolved)):
+    if not str(session_file_path).startswith(str(data_dir)):
         raise ValueError("Path traversal detected")
     
     return session_file_path
 
 
+# Background thread that writes queued log records to the real handlers
+_log_listener: logging.handlers.QueueListener = None
+
+
+def _stop_log_listener():
+    """停止当前的日志监听线程（写完队列中剩余的记录）并关闭其处理器"""
+    global _log_listener
+    listener, _log_listener = _log_listener, None
+    if listener is None:
+        return
+    listener.stop()
+    for handler in listener.handlers:
+        handler.close()
+
+
+# Stopped at interpreter exit so records logged during shutdown are still written
+atexit.register(_stop_log_listener)
+
+
 def setup_logging(log_level: str = "INFO", log_dir: str = "./logs") -> logging.Logger:
     """
     Configure logging with both console and file handlers.
+    Records are handed to the handlers through a queue, so console and file
+    I/O happen on a listener thread rather than in the caller.
     
     Args:
         log_level: Logging level (DEBUG, INFO, WARNING, ERROR, CRITICAL)
@@ -133,7 +196,10 @@ def setup_logging(log_level: str = "INFO", log_dir: str = "./logs") -> logging.L
     root_logger = logging.getLogger()
     root_logger.setLevel(getattr(logging, log_level.upper(), logging.INFO))
     
-    # Remove existing handlers to avoid duplicates
+    # Remove existing handlers to avoid duplicates (closing the previous
+    # listener's file handlers)
+    global _log_listener
+    _stop_log_listener()
     root_logger.handlers.clear()
     
     # Create formatters
@@ -151,7 +217,6 @@ def setup_logging(log_level: str = "INFO", log_dir: str = "./logs") -> logging.L
     console_handler = logging.StreamHandler(sys.stdout)
     console_handler.setLevel(logging.INFO)
     console_handler.setFormatter(simple_formatter)
-    root_logger.addHandler(console_handler)
     
     # File handler for all logs (DEBUG and above)
     file_handler = logging.handlers.RotatingFileHandler(
@@ -162,7 +227,6 @@ def setup_logging(log_level: str = "INFO", log_dir: str = "./logs") -> logging.L
     )
     file_handler.setLevel(logging.DEBUG)
     file_handler.setFormatter(detailed_formatter)
-    root_logger.addHandler(file_handler)
     
     # File handler for errors only
     error_handler = logging.handlers.RotatingFileHandler(
@@ -173,7 +237,18 @@ def setup_logging(log_level: str = "INFO", log_dir: str = "./logs") -> logging.L
     )
     error_handler.setLevel(logging.ERROR)
     error_handler.setFormatter(detailed_formatter)
-    root_logger.addHandler(error_handler)
+    
+    # Callers only enqueue records; the listener applies each handler's level
+    log_queue = queue.SimpleQueue()
+    root_logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    _log_listener = logging.handlers.QueueListener(
+        log_queue,
+        console_handler,
+        file_handler,
+        error_handler,
+        respect_handler_level=True
+    )
+    _log_listener.start()
     
     # Return a logger for this module
     return logging.getLogger(__name__)
@@ -186,26 +261,16 @@ logger = setup_logging(
 )
 
 
-# Global instances
-scheduler: AsyncIOScheduler = None
-telegram_client: TelegramClientWrapper = None
-session_manager: SessionManager = None
-bot_notifier: BotNotifier = None
-config: Config = None
-
-
-@asynccontextmanager
-async def lifespan(app: FastAPI):
-    """
-    Lifespan context manager for FastAPI application.
-    Handles startup and shutdown events.
+def _load_config() -> Config:
     """
-    # Startup
-    logger.info("Starting FastAPI application")
-    
-    global scheduler, telegram_client, session_manager, bot_notifier, config
+    从环境变量读取配置
     
-    # Load configuration from environment variables
+    Returns:
+        Config: 配置对象
+        
+    Raises:
+        ValueError: 如果缺少 TG_API_ID / TG_API_HASH 或数值配置无法解析
+    """
     config = Config(
         api_id=int(os.getenv("TG_API_ID", "32471437")),
         api_hash=os.getenv("TG_API_HASH", "c356cf8137a04c92ebfda0fdbd299604"),
@@ -214,7 +279,8 @@ async def lifespan(app: FastAPI):
         notify_bot_token=os.getenv("TG_NOTIFY_BOT_TOKEN", ""),
         notify_bot_name=os.getenv("TG_NOTIFY_BOT_NAME", ""),
         max_failures=int(os.getenv("TG_HEART_BEAT_MAX_FAIL", "3")),
-        data_dir=os.getenv("DATA_DIR", "./data")
+        data_dir=os.getenv("DATA_DIR", "./data"),
+        notify_concurrency=int(os.getenv("TG_NOTIFY_CONCURRENCY", "20"))
     )
     
     # Validate required configuration
@@ -222,11 +288,63 @@ async def lifespan(app: FastAPI):
         logger.error("TG_API_ID and TG_API_HASH are required")
         raise ValueError("Missing required configuration: TG_API_ID and TG_API_HASH")
     
+    return config
+
+
+# Configuration, read from the environment once at import time
+CONFIG = _load_config()
+
+
+# Global instances
+scheduler: AsyncIOScheduler = None
+telegram_client: TelegramClientWrapper = None
+session_manager: SessionManager = None
+bot_notifier: BotNotifier = None
+
+
+async def close_components(
+    session_manager: SessionManager,
+    telegram_client: TelegramClientWrapper,
+    bot_notifier: BotNotifier
+):
+    """
+    并发关闭各组件，单个组件出错不影响其他组件的关闭
+    
+    Args:
+        session_manager: 会话管理器（写出待保存的会话）
+        telegram_client: Telegram 客户端封装（断开池中的客户端）
+        bot_notifier: Bot 通知器（关闭 HTTP 客户端）
+    """
+    results = await asyncio.gather(
+        session_manager.flush_pending_saves(),
+        telegram_client.close(),
+        bot_notifier.close(),
+        return_exceptions=True
+    )
+    
+    actions = ("flushing session saves", "disconnecting Telegram clients", "closing bot notifier")
+    for action, result in zip(actions, results):
+        if isinstance(result, BaseException):
+            logger.error("Error %s: %s", action, result)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Lifespan context manager for FastAPI application.
+    Handles startup and shutdown events.
+    """
+    # Startup
+    logger.info("Starting FastAPI application")
+    
+    global scheduler, telegram_client, session_manager, bot_notifier
+    
     # Initialize components
     scheduler = AsyncIOScheduler()
-    telegram_client = TelegramClientWrapper(config.api_id, config.api_hash)
-    bot_notifier = BotNotifier(config.notify_bot_token)
-    session_manager = SessionManager(scheduler, config, telegram_client, bot_notifier)
+    telegram_client = TelegramClientWrapper(CONFIG.api_id, CONFIG.api_hash)
+    bot_notifier = get_notifier(CONFIG.notify_bot_token, CONFIG.notify_concurrency)
+    await bot_notifier.warm_up()
+    session_manager = SessionManager(scheduler, CONFIG, telegram_client, bot_notifier)
     
     # Start scheduler
     scheduler.start()
@@ -243,7 +361,16 @@ async def lifespan(app: FastAPI):
         id='cleanup_expired_sessions',
         replace_existing=True
     )
-    logger.info(f"Scheduled periodic login session cleanup (every {SESSION_CLEANUP_INTERVAL} seconds)")
+    logger.info("Scheduled periodic login session cleanup (every %s seconds)", SESSION_CLEANUP_INTERVAL)
+    
+    # Add periodic eviction of idle pooled Telegram clients
+    scheduler.add_job(
+        telegram_client.evict_idle_clients,
+        'interval',
+        seconds=CLIENT_EVICT_INTERVAL,
+        id='evict_idle_clients',
+        replace_existing=True
+    )
     
     logger.info("Application startup complete")
     
@@ -260,8 +387,8 @@ async def lifespan(app: FastAPI):
     scheduler.shutdown(wait=False)
     logger.info("APScheduler stopped")
     
-    # Close bot notifier HTTP client
-    await bot_notifier.close()
+    # Flush saves, disconnect Telegram clients and close the bot notifier together
+    await close_components(session_manager, telegram_client, bot_notifier)
     
     logger.info("Application shutdown complete")
 
@@ -271,9 +398,13 @@ app = FastAPI(
     title="Telegram Session Keepalive Manager",
     description="Web interface for managing Telegram session keepalive tasks",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
+# Compress larger responses; SSE streams are excluded by GZipMiddleware itself
+app.add_middleware(GZipMiddleware, minimum_size=256, compresslevel=1)
+
 
 # Store active login sessions (session_id -> LoginSession)
 # This is a simple in-memory store for the login flow
@@ -282,12 +413,68 @@ login_sessions: Dict[str, LoginSession] = {}
 # Session configuration
 SESSION_TIMEOUT = 600  # 10 minutes
 SESSION_CLEANUP_INTERVAL = 300  # 5 minutes cleanup interval
+CLIENT_EVICT_INTERVAL = 60  # idle Telegram client eviction interval
 
 # SSE connection management
 active_sse_connections = 0
 MAX_SSE_CONNECTIONS = 50
 sse_connections_lock = asyncio.Lock()
 
+# Parsed task files keyed by UUID, validated by (st_mtime_ns, st_size)
+TASK_CACHE_SIZE = 256
+_task_cache: "OrderedDict[str, Tuple[int, int, dict]]" = OrderedDict()
+
+
+def _read_file(path: Path) -> Tuple[os.stat_result, bytes]:
+    """
+    一次系统调用读出整个文件，并返回与内容对应的 fstat 结果
+    
+    Args:
+        path: 文件路径
+        
+    Returns:
+        Tuple[os.stat_result, bytes]: 打开的文件的状态和内容
+    """
+    fd = os.open(path, os.O_RDONLY | getattr(os, "O_BINARY", 0))
+    try:
+        st = os.fstat(fd)
+        return st, os.read(fd, st.st_size)
+    finally:
+        os.close(fd)
+
+
+async def load_task_file(uuid: str, session_file_path: Path) -> dict:
+    """
+    读取并解析任务文件，文件未变化时直接返回缓存结果
+    
+    Args:
+        uuid: 任务 UUID
+        session_file_path: 已验证的任务文件路径
+        
+    Returns:
+        dict: 解析后的任务数据
+        
+    Raises:
+        FileNotFoundError: 如果任务文件不存在
+        orjson.JSONDecodeError: 如果文件内容不是合法 JSON
+    """
+    st = os.stat(session_file_path)
+    cached = _task_cache.get(uuid)
+    if cached is not None and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+        _task_cache.move_to_end(uuid)
+        return cached[2]
+    
+    # Keyed by the fstat of the file actually read, in case it was replaced
+    # after the stat above
+    st, raw = await asyncio.to_thread(_read_file, session_file_path)
+    session_data = orjson.loads(raw)
+    
+    _task_cache[uuid] = (st.st_mtime_ns, st.st_size, session_data)
+    _task_cache.move_to_end(uuid)
+    if len(_task_cache) > TASK_CACHE_SIZE:
+        _task_cache.popitem(last=False)
+    return session_data
+
 
 async def cleanup_login_session(session_id: str):
     """
@@ -299,7 +486,7 @@ async def cleanup_login_session(session_id: str):
     session = login_sessions.pop(session_id, None)
     if session and session.client.is_connected():
         await session.client.disconnect()
-        logger.info(f"Cleaned up login session: {session_id}")
+        logger.info("Cleaned up login session: %s", session_id)
 
 
 async def cleanup_expired_sessions():
@@ -321,10 +508,10 @@ async def cleanup_expired_sessions():
         session = login_sessions.pop(session_id, None)
         if session and session.client.is_connected():
             await session.client.disconnect()
-        logger.info(f"Cleaned up expired login session: {session_id}")
+        logger.info("Cleaned up expired login session: %s", session_id)
     
     if expired_sessions:
-        logger.info(f"Cleaned up {len(expired_sessions)} expired login sessions")
+        logger.info("Cleaned up %s expired login sessions", len(expired_sessions))
 
 
 async def cleanup_all_login_sessions():
@@ -341,7 +528,7 @@ async def cleanup_all_login_sessions():
             await session.client.disconnect()
     
     if session_ids:
-        logger.info(f"Cleaned up all {len(session_ids)} login sessions")
+        logger.info("Cleaned up all %s login sessions", len(session_ids))
 
 
 @app.get("/api/health")
@@ -364,7 +551,7 @@ async def login_start(request: LoginStartRequest):
     Raises:
         HTTPException: If login fails
     """
-    logger.info(f"Login start request for phone: {request.phone}")
+    logger.info("Login start request for phone: %s", request.phone)
     
     try:
         # Start login process and get client
@@ -384,9 +571,9 @@ async def login_start(request: LoginStartRequest):
         )
         login_sessions[session_id] = login_session
         
-        logger.info(f"Verification code sent to {request.phone}, session_id: {session_id}")
+        logger.info("Verification code sent to %s, session_id: %s", request.phone, session_id)
         
-        return JSONResponse(
+        return ORJSONResponse(
             status_code=status.HTTP_200_OK,
             content={
                 "status": "code_sent",
@@ -397,13 +584,13 @@ async def login_start(request: LoginStartRequest):
         )
         
     except ValueError as e:
-        logger.error(f"Login start failed for {request.phone}: {e}")
+        logger.error("Login start failed for %s: %s", request.phone, e)
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=str(e)
         )
     except Exception as e:
-        logger.error(f"Unexpected error during login start: {e}")
+        logger.error("Unexpected error during login start: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Internal server error during login"
@@ -424,11 +611,11 @@ async def login_code(request: LoginCodeRequest):
     Raises:
         HTTPException: If code submission fails
     """
-    logger.info(f"Login code submission for session_id: {request.session_id}")
+    logger.info("Login code submission for session_id: %s", request.session_id)
     
     # Check if session exists
     if request.session_id not in login_sessions:
-        logger.error(f"Session not found: {request.session_id}")
+        logger.error("Session not found: %s", request.session_id)
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Invalid or expired session. Please start login again."
@@ -449,9 +636,9 @@ async def login_code(request: LoginCodeRequest):
             # 2FA is enabled, need password
             login_session.status = "password_required"
             
-            logger.info(f"2FA password required for session {request.session_id}")
+            logger.info("2FA password required for session %s", request.session_id)
             
-            return JSONResponse(
+            return ORJSONResponse(
                 status_code=status.HTTP_200_OK,
                 content={
                     "status": "password_required",
@@ -467,9 +654,9 @@ async def login_code(request: LoginCodeRequest):
             # Clean up login session
             await cleanup_login_session(request.session_id)
             
-            logger.info(f"Login successful for session {request.session_id} (user_id: {tg_id})")
+            logger.info("Login successful for session %s (user_id: %s)", request.session_id, tg_id)
             
-            return JSONResponse(
+            return ORJSONResponse(
                 status_code=status.HTTP_200_OK,
                 content={
                     "status": "success",
@@ -482,7 +669,7 @@ async def login_code(request: LoginCodeRequest):
     except ValueError as e:
         # Clean up login session on error
         await cleanup_login_session(request.session_id)
-        logger.error(f"Login code submission failed for session {request.session_id}: {e}")
+        logger.error("Login code submission failed for session %s: %s", request.session_id, e)
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=str(e)
@@ -490,7 +677,7 @@ async def login_code(request: LoginCodeRequest):
     except Exception as e:
         # Clean up login session on error
         await cleanup_login_session(request.session_id)
-        logger.error(f"Unexpected error during code submission: {e}")
+        logger.error("Unexpected error during code submission: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Internal server error during code submission"
@@ -511,11 +698,11 @@ async def login_password(request: LoginPasswordRequest):
     Raises:
         HTTPException: If password submission fails
     """
-    logger.info(f"Login password submission for session_id: {request.session_id}")
+    logger.info("Login password submission for session_id: %s", request.session_id)
     
     # Check if session exists
     if request.session_id not in login_sessions:
-        logger.error(f"Session not found: {request.session_id}")
+        logger.error("Session not found: %s", request.session_id)
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Invalid or expired session. Please start login again."
@@ -525,7 +712,7 @@ async def login_password(request: LoginPasswordRequest):
     
     # Verify session is in password_required state
     if login_session.status != "password_required":
-        logger.error(f"Session {request.session_id} is not in password_required state")
+        logger.error("Session %s is not in password_required state", request.session_id)
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Session is not in password_required state"
@@ -541,9 +728,9 @@ async def login_password(request: LoginPasswordRequest):
         # Clean up login session
         await cleanup_login_session(request.session_id)
         
-        logger.info(f"Login successful with 2FA for session {request.session_id} (user_id: {tg_id})")
+        logger.info("Login successful with 2FA for session %s (user_id: %s)", request.session_id, tg_id)
         
-        return JSONResponse(
+        return ORJSONResponse(
             status_code=status.HTTP_200_OK,
             content={
                 "status": "success",
@@ -556,7 +743,7 @@ async def login_password(request: LoginPasswordRequest):
     except ValueError as e:
         # Clean up login session on error
         await cleanup_login_session(request.session_id)
-        logger.error(f"Login password submission failed for session {request.session_id}: {e}")
+        logger.error("Login password submission failed for session %s: %s", request.session_id, e)
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=str(e)
@@ -564,7 +751,7 @@ async def login_password(request: LoginPasswordRequest):
     except Exception as e:
         # Clean up login session on error
         await cleanup_login_session(request.session_id)
-        logger.error(f"Unexpected error during password submission: {e}")
+        logger.error("Unexpected error during password submission: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Internal server error during password submission"
@@ -589,12 +776,13 @@ async def validate_task_session(request: ValidateSessionRequest):
     
     try:
         # Validate session and get account info
-        logger.debug(f"Validating session: {mask_sensitive_data(request.session_string)}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Validating session: %s", mask_sensitive_data(request.session_string))
         account_info = await telegram_client.validate_session(request.session_string)
         
-        logger.info(f"Session validated for user {account_info['tg_id']}")
+        logger.info("Session validated for user %s", account_info['tg_id'])
         
-        return JSONResponse(
+        return ORJSONResponse(
             status_code=status.HTTP_200_OK,
             content={
                 "status": "valid",
@@ -603,19 +791,19 @@ async def validate_task_session(request: ValidateSessionRequest):
                 "phone": account_info.get("phone"),
                 "first_name": account_info.get("first_name"),
                 "last_name": account_info.get("last_name"),
-                "bot_name": config.notify_bot_name,
+                "bot_name": CONFIG.notify_bot_name,
                 "message": "Session is valid"
             }
         )
         
     except ValueError as e:
-        logger.error(f"Session validation failed: {e}")
+        logger.error("Session validation failed: %s", e)
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=str(e)
         )
     except Exception as e:
-        logger.error(f"Unexpected error during session validation: {e}")
+        logger.error("Unexpected error during session validation: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Internal server error during session validation"
@@ -636,11 +824,12 @@ async def create_keepalive_task(request: CreateTaskRequest):
     Raises:
         HTTPException: If task creation fails
     """
-    logger.info(f"Creating keepalive task for notify_chat_id: {request.notify_chat_id}")
+    logger.info("Creating keepalive task for notify_chat_id: %s", request.notify_chat_id)
     
     try:
         # Create the task
-        logger.debug(f"Creating task with session: {mask_sensitive_data(request.session_string)}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Creating task with session: %s", mask_sensitive_data(request.session_string))
         task_uuid = await session_manager.create_task(
             request.session_string,
             request.notify_chat_id
@@ -651,26 +840,26 @@ async def create_keepalive_task(request: CreateTaskRequest):
         # In production, this should use the actual base URL from config
         verify_url = f"/verifyCode/{task_uuid}"
         
-        logger.info(f"Task created successfully: {task_uuid}")
+        logger.info("Task created successfully: %s", task_uuid)
         
-        return JSONResponse(
+        return ORJSONResponse(
             status_code=status.HTTP_201_CREATED,
             content={
                 "status": "created",
                 "uuid": task_uuid,
                 "verify_url": verify_url,
-                "message": f"Keepalive task created successfully. Please start the bot @{config.notify_bot_name} to receive notifications."
+                "message": f"Keepalive task created successfully. Please start the bot @{CONFIG.notify_bot_name} to receive notifications."
             }
         )
         
     except ValueError as e:
-        logger.error(f"Task creation failed: {e}")
+        logger.error("Task creation failed: %s", e)
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=str(e)
         )
     except Exception as e:
-        logger.error(f"Unexpected error during task creation: {e}")
+        logger.error("Unexpected error during task creation: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Internal server error during task creation"
@@ -700,12 +889,13 @@ async def listen_verification_code(session_string: str = Query(..., description=
         HTTPException: 503 if connection limit reached
     """
     logger.info("SSE verification code listening request received")
-    logger.debug(f"SSE session: {mask_sensitive_data(session_string)}")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("SSE session: %s", mask_sensitive_data(session_string))
     
     # Check connection limit before establishing connection
     async with sse_connections_lock:
         if active_sse_connections >= MAX_SSE_CONNECTIONS:
-            logger.warning(f"SSE connection limit reached: {active_sse_connections}/{MAX_SSE_CONNECTIONS}")
+            logger.warning("SSE connection limit reached: %s/%s", active_sse_connections, MAX_SSE_CONNECTIONS)
             raise HTTPException(
                 status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
                 detail="Too many active connections. Please try again later."
@@ -720,7 +910,7 @@ async def listen_verification_code(session_string: str = Query(..., description=
         # Increment connection count
         async with sse_connections_lock:
             active_sse_connections += 1
-            logger.info(f"SSE connection established. Active connections: {active_sse_connections}/{MAX_SSE_CONNECTIONS}")
+            logger.info("SSE connection established. Active connections: %s/%s", active_sse_connections, MAX_SSE_CONNECTIONS)
         
         client = None
         session = None
@@ -734,20 +924,39 @@ async def listen_verification_code(session_string: str = Query(..., description=
             try:
                 session = StringSession(session_string)
             except Exception as e:
-                logger.error(f"SSE: Failed to create StringSession: {e}")
+                logger.error("SSE: Failed to create StringSession: %s", e)
                 raise ValueError(f"Invalid session string: {e}")
             
             # Create Telethon client
             client = TelegramClient(
                 session,
-                config.api_id,
-                config.api_hash
+                CONFIG.api_id,
+                CONFIG.api_hash
             )
             
+            # Resolved once with the first code received
+            code_future = asyncio.get_running_loop().create_future()
+            
+            # Register event handler for messages from 777000 before connecting,
+            # so no update arriving right after connect is missed
+            @client.on(events.NewMessage(from_users=777000))
+            async def handler(event):
+                logger.info("SSE: Received message from 777000: %s", event.raw_text)
+                
+                # Extract verification code
+                code = telegram_client._extract_verification_code(event.raw_text)
+                if code and not code_future.done():
+                    code_future.set_result(code)
+                    logger.info("SSE: Verification code extracted: %s", code)
+            
             await client.connect()
-            await client.start()
             
-            logger.info("SSE: Telethon client connected and started")
+            # An existing StringSession only needs to be authorized; start() would
+            # fall back to an interactive login prompt otherwise
+            if not await client.is_user_authorized():
+                raise AuthKeyUnregisteredError(request=None)
+            
+            logger.info("SSE: Telethon client connected and authorized")
             
             # Send connected event
             yield {
@@ -755,33 +964,17 @@ async def listen_verification_code(session_string: str = Query(..., description=
                 "data": json.dumps({"status": "waiting", "message": "Listening for verification code..."})
             }
             
-            # Flag to track if code was received
-            code_received = asyncio.Event()
-            verification_code = None
-            
-            # Register event handler for messages from 777000
-            @client.on(events.NewMessage(from_users=777000))
-            async def handler(event):
-                nonlocal verification_code
-                logger.info(f"SSE: Received message from 777000: {event.raw_text}")
-                
-                # Extract verification code
-                code = telegram_client._extract_verification_code(event.raw_text)
-                if code:
-                    verification_code = code
-                    code_received.set()
-                    logger.info(f"SSE: Verification code extracted: {code}")
-            
             # Keep connection alive and wait for code or timeout
             while time.time() - start_time < timeout:
                 # Check if code was received
-                if code_received.is_set():
+                if code_future.done():
+                    verification_code = code_future.result()
                     # Send code event
                     yield {
                         "event": "code",
                         "data": json.dumps({"code": verification_code})
                     }
-                    logger.info(f"SSE: Code event sent: {verification_code}")
+                    logger.info("SSE: Code event sent: %s", verification_code)
                     break
                 
                 # Send heartbeat event
@@ -811,7 +1004,7 @@ async def listen_verification_code(session_string: str = Query(..., description=
                 })
             }
         except Exception as e:
-            logger.error(f"SSE: Error during verification code listening: {e}")
+            logger.error("SSE: Error during verification code listening: %s", e)
             yield {
                 "event": "error",
                 "data": json.dumps({"error": str(e)})
@@ -825,17 +1018,17 @@ async def listen_verification_code(session_string: str = Query(..., description=
                         await client.disconnect()
                         logger.info("SSE: Telethon client disconnected")
                 except Exception as e:
-                    logger.error(f"SSE: Error disconnecting client: {e}")
+                    logger.error("SSE: Error disconnecting client: %s", e)
             
             # Decrement connection count
             async with sse_connections_lock:
                 active_sse_connections -= 1
-                logger.info(f"SSE connection closed. Active connections: {active_sse_connections}/{MAX_SSE_CONNECTIONS}")
+                logger.info("SSE connection closed. Active connections: %s/%s", active_sse_connections, MAX_SSE_CONNECTIONS)
     
     return EventSourceResponse(event_generator())
 
 
-@app.get("/api/task/{uuid}")
+@app.get("/api/task/{uuid}", response_model=TaskInfoResponse)
 async def get_task_info(uuid: str):
     """
     Get task information by UUID.
@@ -849,67 +1042,74 @@ async def get_task_info(uuid: str):
     Raises:
         HTTPException: If UUID format is invalid (400), path traversal detected (400), or UUID not found (404)
     """
-    logger.info(f"Get task info request for UUID: {uuid}")
+    logger.info("Get task info request for UUID: %s", uuid)
     
     try:
         # Validate UUID and construct safe path
-        session_file_path = validate_safe_path(uuid, config.data_dir)
+        session_file_path = validate_safe_path(uuid, CONFIG.data_path)
     except ValueError as e:
-        logger.warning(f"Invalid UUID or path traversal attempt: {uuid} - {e}")
+        logger.warning("Invalid UUID or path traversal attempt: %s - %s", uuid, e)
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Invalid UUID format or path traversal detected: {str(e)}"
         )
     
-    # Check if file exists
-    if not session_file_path.exists():
-        logger.warning(f"UUID not found: {uuid}")
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Task with UUID {uuid} not found"
-        )
+    # Serve loaded tasks from memory; the task file is only read for
+    # tasks the session manager does not hold
+    session_data = session_manager.get_task_view(uuid)
     
+    task_info = None
     try:
-        # Load session file
-        with open(session_file_path, 'r') as f:
-            session_data = json.load(f)
+        if session_data is None:
+            # Load session file (cached while its mtime and size are unchanged)
+            session_data = await load_task_file(uuid, session_file_path)
         
         session_string = session_data.get("session_string")
-        
-        if not session_string:
-            logger.error(f"Session string not found in file for UUID: {uuid}")
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="Session string not found in task file"
+        if session_string:
+            # Validated here so malformed fields in a task file are reported
+            task_info = TaskInfoResponse(
+                uuid=uuid,
+                session_string=session_string,
+                tg_id=session_data.get("tg_id"),
+                notify_chat_id=session_data.get("notify_chat_id"),
+                created_at=session_data.get("created_at"),
+                last_heartbeat=session_data.get("last_heartbeat"),
+                consecutive_failures=session_data.get("consecutive_failures", 0)
             )
-        
-        logger.info(f"Task info retrieved for UUID: {uuid}")
-        
-        return JSONResponse(
-            status_code=status.HTTP_200_OK,
-            content={
-                "uuid": uuid,
-                "session_string": session_string,
-                "tg_id": session_data.get("tg_id"),
-                "notify_chat_id": session_data.get("notify_chat_id"),
-                "created_at": session_data.get("created_at"),
-                "last_heartbeat": session_data.get("last_heartbeat"),
-                "consecutive_failures": session_data.get("consecutive_failures", 0)
-            }
+    except FileNotFoundError:
+        logger.warning("UUID not found: %s", uuid)
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Task with UUID {uuid} not found"
         )
-        
-    except json.JSONDecodeError as e:
-        logger.error(f"Failed to parse JSON file for UUID {uuid}: {e}")
+    except (orjson.JSONDecodeError, ValidationError) as e:
+        logger.error("Failed to parse JSON file for UUID %s: %s", uuid, e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to parse task file"
         )
     except Exception as e:
-        logger.error(f"Error loading task info for UUID {uuid}: {e}")
+        logger.error("Error loading task info for UUID %s: %s", uuid, e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Internal server error"
         )
+    
+    if task_info is None:
+        logger.error("Session string not found in file for UUID: %s", uuid)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Session string not found in task file"
+        )
+    
+    logger.info("Task info retrieved for UUID: %s", uuid)
+    
+    # Encoded straight to JSON bytes by pydantic-core
+    return Response(
+        content=task_info.model_dump_json(),
+        status_code=status.HTTP_200_OK,
+        media_type="application/json"
+    )
 
 
 @app.delete("/api/task/{uuid}")
@@ -926,34 +1126,28 @@ async def delete_task(uuid: str):
     Raises:
         HTTPException: If UUID format is invalid (400), path traversal detected (400), or UUID not found (404)
     """
-    logger.info(f"Delete task request for UUID: {uuid}")
+    logger.info("Delete task request for UUID: %s", uuid)
     
     try:
         # Validate UUID format
         if not validate_uuid_format(uuid):
             raise ValueError("Invalid UUID format")
     except ValueError as e:
-        logger.warning(f"Invalid UUID format: {uuid} - {e}")
+        logger.warning("Invalid UUID format: %s - %s", uuid, e)
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Invalid UUID format: {str(e)}"
         )
     
-    # Check if task exists in session manager
-    if uuid not in session_manager.sessions:
-        logger.warning(f"UUID not found in session manager: {uuid}")
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Task with UUID {uuid} not found"
-        )
-    
     try:
-        # Use session manager's cleanup_task method for complete cleanup
+        # Use session manager's cleanup_task method for complete cleanup;
+        # it raises KeyError for unknown tasks
         await session_manager.cleanup_task(uuid, "用户手动删除")
+        _task_cache.pop(uuid, None)
         
-        logger.info(f"Task deleted successfully: {uuid}")
+        logger.info("Task deleted successfully: %s", uuid)
         
-        return JSONResponse(
+        return ORJSONResponse(
             status_code=status.HTTP_200_OK,
             content={
                 "status": "deleted",
@@ -962,8 +1156,14 @@ async def delete_task(uuid: str):
             }
         )
         
+    except KeyError:
+        logger.warning("UUID not found in session manager: %s", uuid)
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Task with UUID {uuid} not found"
+        )
     except Exception as e:
-        logger.error(f"Error deleting task {uuid}: {e}")
+        logger.error("Error deleting task %s: %s", uuid, e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Internal server error during task deletion: {str(e)}"
@@ -980,145 +1180,67 @@ async def verify_code_redirect(uuid: str):
         
     Returns:
         Redirect to main page with uuid query parameter
+        
+    Raises:
+        HTTPException: If UUID format is invalid (400)
     """
-    return RedirectResponse(url=f"/?uuid={uuid}", status_code=302)
+    # A canonical UUID contains only hex digits and dashes, so it can be
+    # placed in the query string as-is
+    if not validate_uuid_format(uuid):
+        logger.warning("Invalid UUID format in verify redirect: %s", uuid)
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid UUID format"
+        )
+    
+    return RedirectResponse(url=f"/?uuid={uuid}", status_code=status.HTTP_307_TEMPORARY_REDIRECT)
 
 
 async def main():
     """
     Main entry point for the application.
     
-    Initializes all components and starts the FastAPI server.
-    Handles graceful shutdown of all resources.
+    Serves the FastAPI app on the running event loop. Components are created
+    and shut down by the app's lifespan, so there is exactly one set of them.
     """
     logger.info("=" * 80)
     logger.info("Starting Telegram Session Keepalive Manager")
     logger.info("=" * 80)
     
-    # Load configuration
-    try:
-        config = Config(
-            api_id=int(os.getenv("TG_API_ID", "32471437")),
-            api_hash=os.getenv("TG_API_HASH", "c356cf8137a04c92ebfda0fdbd299604"),
-            interval_seconds=int(os.getenv("TG_INTERVAL_SECONDS", "86400")),
-            jitter_seconds=int(os.getenv("TG_JITTER_SECONDS", "300")),
-            notify_bot_token=os.getenv("TG_NOTIFY_BOT_TOKEN", ""),
-            notify_bot_name=os.getenv("TG_NOTIFY_BOT_NAME", ""),
-            max_failures=int(os.getenv("TG_HEART_BEAT_MAX_FAIL", "3")),
-            data_dir=os.getenv("DATA_DIR", "./data")
-        )
-        
-        # Validate required configuration
-        if not config.api_id or not config.api_hash:
-            logger.error("FATAL: TG_API_ID and TG_API_HASH are required")
-            raise ValueError("Missing required configuration: TG_API_ID and TG_API_HASH")
-        
-        logger.info("Configuration loaded successfully")
-        logger.info(f"  - API ID: {config.api_id}")
-        logger.info(f"  - Interval: {config.interval_seconds}s")
-        logger.info(f"  - Jitter: {config.jitter_seconds}s")
-        logger.info(f"  - Max failures: {config.max_failures}")
-        logger.info(f"  - Data directory: {config.data_dir}")
-        
-    except Exception as e:
-        logger.error(f"FATAL: Failed to load configuration: {e}")
-        sys.exit(1)
-    
-    # Initialize scheduler
-    try:
-        scheduler = AsyncIOScheduler()
-        logger.info("APScheduler initialized")
-    except Exception as e:
-        logger.error(f"FATAL: Failed to initialize APScheduler: {e}")
-        sys.exit(1)
-    
-    # Initialize Telegram client wrapper
-    try:
-        telegram_client = TelegramClientWrapper(config.api_id, config.api_hash)
-        logger.info("Telegram client wrapper initialized")
-    except Exception as e:
-        logger.error(f"FATAL: Failed to initialize Telegram client: {e}")
-        sys.exit(1)
-    
-    # Initialize Bot notifier
-    try:
-        bot_notifier = BotNotifier(config.notify_bot_token)
-        logger.info("Bot notifier initialized")
-    except Exception as e:
-        logger.error(f"FATAL: Failed to initialize Bot notifier: {e}")
-        sys.exit(1)
-    
-    # Initialize Session Manager
-    try:
-        session_manager = SessionManager(scheduler, config, telegram_client, bot_notifier)
-        logger.info("Session manager initialized")
-    except Exception as e:
-        logger.error(f"FATAL: Failed to initialize Session manager: {e}")
-        sys.exit(1)
-    
-    # Start scheduler
-    try:
-        scheduler.start()
-        logger.info("APScheduler started")
-    except Exception as e:
-        logger.error(f"FATAL: Failed to start APScheduler: {e}")
-        sys.exit(1)
-    
-    # Initialize session manager (load existing tasks)
-    try:
-        await session_manager.initialize()
-        logger.info("Session manager initialization complete")
-    except Exception as e:
-        logger.error(f"FATAL: Failed to initialize session manager: {e}")
-        scheduler.shutdown(wait=False)
-        sys.exit(1)
-    
-    logger.info("=" * 80)
-    logger.info("Application startup complete - ready to accept requests")
-    logger.info("=" * 80)
+    # Configuration was loaded and validated at import time
+    logger.info("Configuration loaded successfully")
+    logger.info("  - API ID: %s", CONFIG.api_id)
+    logger.info("  - Interval: %ss", CONFIG.interval_seconds)
+    logger.info("  - Jitter: %ss", CONFIG.jitter_seconds)
+    logger.info("  - Max failures: %s", CONFIG.max_failures)
+    logger.info("  - Data directory: %s", CONFIG.data_dir)
     
     # Get configuration from environment
     host = os.getenv("HOST", "0.0.0.0")
     port = int(os.getenv("PORT", "8000"))
-    reload = os.getenv("RELOAD", "false").lower() == "true"
-    
-    logger.info(f"Starting FastAPI server on {host}:{port}")
     
-    # Import uvicorn here to avoid issues if not installed
-    import uvicorn
+    logger.info("Starting FastAPI server on %s:%s", host, port)
     
     try:
-        # Run the application
-        await asyncio.to_thread(
-            uvicorn.run,
-            "web_server:app",
+        # Serve the application on the already running event loop
+        server = uvicorn.Server(uvicorn.Config(
+            app,
             host=host,
             port=port,
-            reload=reload,
+            http="httptools",
             log_level="info"
-        )
+        ))
+        # uvicorn handles SIGINT/SIGTERM itself and re-delivers the signal to the
+        # previous handler after stopping; ignore it there so main() returns
+        # normally and queued log records are still written at exit
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(sig, signal.SIG_IGN)
+        await server.serve()
     except KeyboardInterrupt:
         logger.info("Received keyboard interrupt, shutting down...")
     except Exception as e:
-        logger.error(f"Error running server: {e}")
+        logger.error("Error running server: %s", e)
     finally:
-        # Graceful shutdown
-        logger.info("=" * 80)
-        logger.info("Shutting down application")
-        logger.info("=" * 80)
-        
-        try:
-            scheduler.shutdown(wait=False)
-            logger.info("APScheduler stopped")
-        except Exception as e:
-            logger.error(f"Error stopping scheduler: {e}")
-        
-        try:
-            await bot_notifier.close()
-            logger.info("Bot notifier closed")
-        except Exception as e:
-            logger.error(f"Error closing bot notifier: {e}")
-        
         logger.info("=" * 80)
         logger.info("Application shutdown complete")
         logger.info("=" * 80)
@@ -1127,22 +1249,23 @@ async def main():
 # Mount static files - must be done after all routes are defined
 # This catches all remaining routes and serves static files
 static_dir = Path(__file__).parent / "static"
-if static_dir.exists():
-    app.mount("/", StaticFiles(directory=str(static_dir), html=True), name="static")
-    logger.info(f"Static files mounted from: {static_dir}")
+if os.path.isdir(static_dir):
+    app.mount("/", CachedStaticFiles(directory=str(static_dir), html=True), name="static")
+    logger.info("Static files mounted from: %s", static_dir)
 else:
-    logger.warning(f"Static directory not found: {static_dir}")
+    logger.warning("Static directory not found: %s", static_dir)
 
 
 if __name__ == "__main__":
-    import uvicorn
-    
-    # Run the main function
+    # Run the main function (on uvloop when available)
     try:
-        asyncio.run(main())
+        if uvloop is not None:
+            uvloop.run(main())
+        else:
+            asyncio.run(main())
     except KeyboardInterrupt:
         logger.info("Application terminated by user")
         sys.exit(0)
     except Exception as e:
-        logger.error(f"Fatal error: {e}")
+        logger.error("Fatal error: %s", e)
         sys.exit(1)